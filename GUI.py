@@ -1,10 +1,18 @@
 import pygame
-import os
+import argparse
 import sys
+import threading
+import assets
 import chess
-from pygame.locals import QUIT, MOUSEBUTTONUP, MOUSEBUTTONDOWN
-
-FPS = 30
+import engine
+from pygame.locals import QUIT, MOUSEBUTTONUP, MOUSEBUTTONDOWN, \
+    MOUSEMOTION, VIDEOEXPOSE, VIDEORESIZE, USEREVENT, RESIZABLE
+
+BLINK_EVENT = USEREVENT
+ENGINE_EVENT = USEREVENT + 1
+BLINK_INTERVAL = 500
+ENGINE_DEPTH = 6
+ENGINE_TIME = 2.0
 WINDOW_WIDTH = 640
 WINDOW_HEIGHT = 480
 BOX_SIZE = 50
@@ -12,6 +20,11 @@ BOARD_WIDTH = 8
 BOARD_HEIGHT = 8
 X_MARGIN = int((WINDOW_WIDTH - (BOARD_WIDTH * BOX_SIZE)) / 2)
 Y_MARGIN = int((WINDOW_HEIGHT - (BOARD_HEIGHT * BOX_SIZE)) / 2)
+# Room kept above and below the board, for the thinking indicator, and
+# on its sides.
+STATUS_HEIGHT = Y_MARGIN
+SIDE_WIDTH = X_MARGIN
+MIN_BOX_SIZE = 20
 LIGHT_BOX_COLOR = (255, 170, 85)
 DARK_BOX_COLOR = (102, 51, 0)
 BACKGROUND = (50, 0, 0)
@@ -24,6 +37,18 @@ BLACK = 'black'
 EMPTY = None
 
 
+def layout(width, height):
+    """Fit the board into a window of `width` by `height` pixels."""
+    global WINDOW_WIDTH, WINDOW_HEIGHT, BOX_SIZE, X_MARGIN, Y_MARGIN
+    WINDOW_WIDTH = width
+    WINDOW_HEIGHT = height
+    BOX_SIZE = max(min(width // BOARD_WIDTH,
+                       (height - 2 * STATUS_HEIGHT) // BOARD_HEIGHT),
+                   MIN_BOX_SIZE)
+    X_MARGIN = int((WINDOW_WIDTH - (BOARD_WIDTH * BOX_SIZE)) / 2)
+    Y_MARGIN = int((WINDOW_HEIGHT - (BOARD_HEIGHT * BOX_SIZE)) / 2)
+
+
 def left_top_coords_of_box(box):
     left = box[0] * BOX_SIZE + X_MARGIN
     top = box[1] * BOX_SIZE + Y_MARGIN
@@ -31,13 +56,41 @@ def left_top_coords_of_box(box):
 
 
 def get_box_at_pixel(pixel):
+    x = (pixel[0] - X_MARGIN) // BOX_SIZE
+    y = (pixel[1] - Y_MARGIN) // BOX_SIZE
+    if pixel[0] < X_MARGIN or pixel[1] < Y_MARGIN:
+        return (None, None)
+    if x >= BOARD_WIDTH or y >= BOARD_HEIGHT:
+        return (None, None)
+    return (x, y)
+
+
+def box_rect(box):
+    left, top = left_top_coords_of_box(box)
+    return pygame.Rect(left, top, BOX_SIZE, BOX_SIZE)
+
+
+def boxes_under(rect):
+    """Return the boxes which `rect` overlaps."""
+    return [(x, y) for y in range(BOARD_HEIGHT) for x in range(BOARD_WIDTH)
+            if box_rect((x, y)).colliderect(rect)]
+
+
+def board_surface(box_size):
+    """Render the empty board once, so that it is blitted instead of
+    drawn square by square.
+
+    """
+    surface = pygame.Surface((BOARD_WIDTH * box_size,
+                              BOARD_HEIGHT * box_size))
     for y in range(BOARD_HEIGHT):
         for x in range(BOARD_WIDTH):
-            left, top = left_top_coords_of_box((x, y))
-            box_rect = pygame.Rect(left, top, BOX_SIZE, BOX_SIZE)
-            if box_rect.collidepoint(pixel):
-                return (x, y)
-    return (None, None)
+            box = pygame.Rect(x * box_size, y * box_size, box_size, box_size)
+            if (x + y) % 2 == 0:
+                surface.fill(LIGHT_BOX_COLOR, box)
+            else:
+                surface.fill(DARK_BOX_COLOR, box)
+    return surface.convert()
 
 
 def draw_pieces(board):
@@ -47,178 +100,400 @@ def draw_pieces(board):
                 continue
 
             topleft = left_top_coords_of_box((x, y))
-
-            if isinstance(board[y][x], chess.Pawn):
-                if board[y][x].color == WHITE:
-                    DISPLAYSURF.blit(IMAGES['w_pawn'], topleft)
-                else:
-                    DISPLAYSURF.blit(IMAGES['b_pawn'], topleft)
-            elif isinstance(board[y][x], chess.Rook):
-                if board[y][x].color == WHITE:
-                    DISPLAYSURF.blit(IMAGES['w_rook'], topleft)
-                else:
-                    DISPLAYSURF.blit(IMAGES['b_rook'], topleft)
-            elif isinstance(board[y][x], chess.Bishop):
-                if board[y][x].color == WHITE:
-                    DISPLAYSURF.blit(IMAGES['w_bishop'], topleft)
-                else:
-                    DISPLAYSURF.blit(IMAGES['b_bishop'], topleft)
-            elif isinstance(board[y][x], chess.Knight):
-                if board[y][x].color == WHITE:
-                    DISPLAYSURF.blit(IMAGES['w_knight'], topleft)
-                else:
-                    DISPLAYSURF.blit(IMAGES['b_knight'], topleft)
-            elif isinstance(board[y][x], chess.King):
-                if board[y][x].color == WHITE:
-                    DISPLAYSURF.blit(IMAGES['w_king'], topleft)
-                else:
-                    DISPLAYSURF.blit(IMAGES['b_king'], topleft)
-            elif isinstance(board[y][x], chess.Queen):
-                if board[y][x].color == WHITE:
-                    DISPLAYSURF.blit(IMAGES['w_queen'], topleft)
-                else:
-                    DISPLAYSURF.blit(IMAGES['b_queen'], topleft)
+            DISPLAYSURF.blit(IMAGES[board[y][x].symbol], topleft)
 
 
 def draw_board():
-    for y in range(BOARD_HEIGHT):
-        for x in range(BOARD_WIDTH):
-            left, top = left_top_coords_of_box((x, y))
-            box = pygame.Rect(left, top, BOX_SIZE, BOX_SIZE)
-            if (x + y) % 2 == 0:
-                pygame.draw.rect(DISPLAYSURF, LIGHT_BOX_COLOR, box)
-            else:
-                pygame.draw.rect(DISPLAYSURF, DARK_BOX_COLOR, box)
+    DISPLAYSURF.blit(BOARD_SURFACE, (X_MARGIN, Y_MARGIN))
 
 
-def winning_animation(display, game_status):
+def draw_box(board, box, selected):
+    """Draw a single box with its piece and return its rect."""
+    x, y = box
+    rect = box_rect(box)
+    DISPLAYSURF.blit(BOARD_SURFACE, rect, rect.move(-X_MARGIN, -Y_MARGIN))
+    if selected:
+        pygame.draw.rect(DISPLAYSURF, RED, rect, 5)
+    if board[y][x] is not EMPTY:
+        DISPLAYSURF.blit(IMAGES[board[y][x].symbol], rect)
+    return rect
+
+
+def status_text(game_status):
     text = BIGFONT.render(game_status, True, TEXT_COLOR)
     text_rect = text.get_rect()
     text_rect.center = (int(WINDOW_WIDTH / 2), int(WINDOW_HEIGHT / 2))
+    return text, text_rect
+
+
+def winning_animation(display, game_status):
+    text, text_rect = status_text(game_status)
     if display:
         DISPLAYSURF.blit(text, text_rect)
+    return text_rect
+
 
+def promotion_buttons():
+    """Return the question and the `(surface, rect, piece class)` buttons
+    shown when a pawn is promoted.
 
-def ask_promotion(color):
+    """
     center = (int(WINDOW_WIDTH / 2), int(WINDOW_HEIGHT / 2))
     text = 'Please choose pawn promotion value:'
     question = FONT.render(text, True, TEXT_COLOR, TEXT_BACKGROUND)
     question_rect = question.get_rect()
     question_rect.center = center
-    knight = FONT.render('Knight', True, TEXT_COLOR, TEXT_BACKGROUND)
-    knight_rect = knight.get_rect()
-    knight_rect.center = (center[0] - 120, center[1] + 30)
-    queen = FONT.render('Queen', True, TEXT_COLOR, TEXT_BACKGROUND)
-    queen_rect = queen.get_rect()
-    queen_rect.center = (center[0] - 60, center[1] + 30)
-    rook = FONT.render('Rook', True, TEXT_COLOR, TEXT_BACKGROUND)
-    rook_rect = rook.get_rect()
-    rook_rect.center = (center[0] + 60, center[1] + 30)
-    bishop = FONT.render('Bishop', True, TEXT_COLOR, TEXT_BACKGROUND)
-    bishop_rect = bishop.get_rect()
-    bishop_rect.center = (center[0] + 120, center[1] + 30)
+    buttons = [(question, question_rect, None)]
+    for name, piece, dx in (('Knight', chess.Knight, -120),
+                            ('Queen', chess.Queen, -60),
+                            ('Rook', chess.Rook, 60),
+                            ('Bishop', chess.Bishop, 120)):
+        button = FONT.render(name, True, TEXT_COLOR, TEXT_BACKGROUND)
+        button_rect = button.get_rect()
+        button_rect.center = (center[0] + dx, center[1] + 30)
+        buttons.append((button, button_rect, piece))
+    return buttons
+
+
+def promotion_choice(buttons, pixel, color):
+    for surface, rect, piece in buttons:
+        if piece is not None and rect.collidepoint(pixel):
+            return piece(color)
+    return None
+
+
+def game_over(game):
+    return game.white_win() or game.black_win() or game.stalemate()
+
+
+def position_key(board):
+    """Return what tells apart positions for pondering: the pieces, the
+    turn and the castling rights.
+
+    """
+    return (tuple(tuple(row) for row in board.board), board.turn,
+            board.castling)
+
+
+class EnginePlayer:
+    """The computer opponent, searching in a worker thread.
+
+    A finished search posts an `ENGINE_EVENT` with its `job` number and
+    `move`. After playing a move the player ponders: it searches the
+    position after the reply it expects, so when the human plays that
+    reply the answer is ready sooner, or at once.
+
+    """
+
+    def __init__(self, color, max_depth=ENGINE_DEPTH,
+                 time_limit=ENGINE_TIME):
+        self.color = color
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.hash_moves = {}
+        self.history = {}
+        self.searcher = None
+        self.thread = None
+        self.job = 0
+        self.pv = []
+        self.ponder_key = None
+        self.ponder_result = None
+
+    def thinking(self):
+        """Return whether the human waits for a move."""
+        return self.thread is not None and self.ponder_key is None
+
+    def start(self, board):
+        """Search `board`, which the worker thread gets to itself."""
+        self.cancel()
+        self.job += 1
+        job = self.job
+        searcher = engine.Engine(self.max_depth, self.time_limit)
+        searcher.hash_moves = self.hash_moves
+        searcher.history = self.history
+        self.searcher = searcher
+
+        def run():
+            result = searcher.search(board)
+            if not searcher.cancelled:
+                pygame.event.post(pygame.event.Event(
+                    ENGINE_EVENT, job=job, move=result.best_move,
+                    pv=result.pv))
+
+        self.thread = threading.Thread(target=run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def cancel(self):
+        """Stop the running search, if any, and forget its result."""
+        if self.thread is not None:
+            self.searcher.cancel()
+            self.thread.join()
+            self.thread = None
+        self.ponder_key = None
+        self.ponder_result = None
+
+    def think(self, game):
+        """Look for a move in `game`, where it is the computer's turn.
+
+        If the human played the expected reply the search pondering it
+        carries on, or its result is posted again if it has finished.
+
+        """
+        if (self.ponder_key is not None and
+                self.ponder_key == position_key(game)):
+            self.ponder_key = None
+            if self.ponder_result is not None:
+                pygame.event.post(self.ponder_result)
+                self.ponder_result = None
+            return
+        self.start(game.copy())
+
+    def ponder(self, game, pv):
+        """Search the reply to the move the human is expected to play in
+        `game` according to the principal variation `pv`.
+
+        """
+        self.cancel()
+        if len(pv) < 2:
+            return
+        board = game.copy()
+        board.make_move(pv[1])
+        key = position_key(board)
+        self.start(board)
+        self.ponder_key = key
+
+    def result(self, event):
+        """Return the move of an `ENGINE_EVENT` if it is to be played
+        now, keeping the result of pondering for when it is needed.
+
+        """
+        if event.job != self.job:
+            return None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.ponder_key is not None:
+            self.ponder_result = event
+            return None
+        self.pv = event.pv
+        return event.move
+
+
+def thinking_text():
+    text = FONT.render('Thinking...', True, TEXT_COLOR)
+    text_rect = text.get_rect()
+    text_rect.center = (int(WINDOW_WIDTH / 2),
+                        WINDOW_HEIGHT - int(Y_MARGIN / 2))
+    return text, text_rect
+
+
+def draw_thinking(thinking):
+    text, text_rect = thinking_text()
+    DISPLAYSURF.fill(BACKGROUND, text_rect)
+    if thinking:
+        DISPLAYSURF.blit(text, text_rect)
+    return text_rect
+
+
+def draw(game, first_selection, buttons, display, thinking=False):
+    DISPLAYSURF.fill(BACKGROUND)
+    draw_board()
+
+    if first_selection:
+        left, top = left_top_coords_of_box(first_selection)
+        selected_box = pygame.Rect(left, top, BOX_SIZE, BOX_SIZE)
+        pygame.draw.rect(DISPLAYSURF, RED, selected_box, 5)
+
+    draw_pieces(game.get_board())
+
+    if buttons:
+        for surface, rect, piece in buttons:
+            DISPLAYSURF.blit(surface, rect)
+
+    if game_over(game):
+        winning_animation(display, game.get_game_status())
+    draw_thinking(thinking)
+
+    pygame.display.update()
+
+
+def draw_changes(game, boxes, first_selection, display, thinking=None):
+    """Redraw `boxes` and whatever lies on them and push only their rects
+    to the screen, with the thinking indicator unless `thinking` is
+    `None`.
+
+    """
+    board = game.get_board()
+    over = game_over(game)
+    if over:
+        text_rect = status_text(game.get_game_status())[1]
+        boxes = set(boxes).union(boxes_under(text_rect))
+    rects = [draw_box(board, box, box == first_selection) for box in boxes]
+    if over:
+        rects.append(winning_animation(display, game.get_game_status()))
+    if thinking is not None:
+        rects.append(draw_thinking(thinking))
+    pygame.display.update(rects)
+
+
+def snapshot(game):
+    return [list(row) for row in game.get_board()]
+
+
+def changed_boxes(board, shown):
+    """Return the boxes whose piece differs between `board` and `shown`."""
+    return [(x, y) for y in range(BOARD_HEIGHT) for x in range(BOARD_WIDTH)
+            if board[y][x] is not shown[y][x]]
+
+
+def human_turn(game, player, buttons):
+    """Return whether the human may click: on their turn, or while their
+    promotion waits for a piece, which is after the turn has passed.
+
+    """
+    if buttons:
+        return True
+    return player is None or game.turn != player.color
+
+
+def click(game, pixel, first_selection, buttons):
+    """Handle a click of the human at `pixel` and return the new
+    `(first_selection, buttons)`, or `None` if the click does nothing.
+
+    """
+    if buttons:
+        piece = promotion_choice(buttons, pixel, game.promotion_color())
+        if piece is None:
+            return None
+        game.set_pawn_promotion(piece)
+        return first_selection, None
+
+    box = get_box_at_pixel(pixel)
+    if box == (None, None):
+        return None
+    if first_selection is None:
+        return box, buttons
+    game.move_piece(first_selection, box)
+    if game.promotion_allowed():
+        buttons = promotion_buttons()
+    return None, buttons
+
+
+def play_move(game, move):
+    """Play a move returned by the engine on the GUI board."""
+    old_pos, new_pos, promotion = move
+    color = game.turn
+    game.move_piece(old_pos, new_pos)
+    if promotion is not None:
+        game.set_pawn_promotion(promotion(color))
+
+
+def main(argv=None):
+    global DISPLAYSURF, IMAGES, FONT, BIGFONT, BOARD_SURFACE
+    parser = argparse.ArgumentParser(description='Play chess.')
+    parser.add_argument('-c', '--computer', choices=(WHITE, BLACK),
+                        help='let the computer play this color')
+    parser.add_argument('-d', '--depth', type=int, default=ENGINE_DEPTH,
+                        help='search depth of the computer')
+    parser.add_argument('-t', '--time', type=float, default=ENGINE_TIME,
+                        help='seconds the computer thinks per move')
+    parser.add_argument('-b', '--box-size', type=int, default=BOX_SIZE,
+                        help='size of a box in pixels; the window can be '
+                             'resized too')
+    parser.add_argument('--atlas', action='store_true',
+                        help='keep the piece images in a single surface')
+    args = parser.parse_args(argv)
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == MOUSEBUTTONUP:
-                mouse_pos = event.pos
-                if knight_rect.collidepoint(mouse_pos):
-                    return chess.Knight(color)
-                elif queen_rect.collidepoint(mouse_pos):
-                    return chess.Queen(color)
-                elif rook_rect.collidepoint(mouse_pos):
-                    return chess.Rook(color)
-                elif bishop_rect.collidepoint(mouse_pos):
-                    return chess.Bishop(color)
-
-        DISPLAYSURF.blit(question, question_rect)
-        DISPLAYSURF.blit(queen, queen_rect)
-        DISPLAYSURF.blit(knight, knight_rect)
-        DISPLAYSURF.blit(rook, rook_rect)
-        DISPLAYSURF.blit(bishop, bishop_rect)
-        pygame.display.update()
-        FPSCLOCK.tick(FPS)
-
-
-def main():
-    global DISPLAYSURF, IMAGES, FONT, BIGFONT, FPSCLOCK
     pygame.init()
-    FPSCLOCK = pygame.time.Clock()
-    DISPLAYSURF = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    box_size = max(args.box_size, MIN_BOX_SIZE)
+    layout(BOARD_WIDTH * box_size + 2 * SIDE_WIDTH,
+           BOARD_HEIGHT * box_size + 2 * STATUS_HEIGHT)
+    DISPLAYSURF = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT),
+                                          RESIZABLE)
     FONT = pygame.font.Font('freesansbold.ttf', 16)
     BIGFONT = pygame.font.Font('freesansbold.ttf', 32)
+    BOARD_SURFACE = board_surface(BOX_SIZE)
 
     pygame.display.set_caption('Chess Game - Maria Tezieva')
+    # Nothing is drawn on mouse movement, so do not wake up for it.
+    pygame.event.set_blocked([MOUSEMOTION, MOUSEBUTTONDOWN])
 
-    IMAGES = {'w_pawn': pygame.image.load(os.path.join('images', 'WP.png')),
-              'b_pawn': pygame.image.load(os.path.join('images', 'BP.png')),
-              'w_rook': pygame.image.load(os.path.join('images', 'WR.png')),
-              'b_rook': pygame.image.load(os.path.join('images', 'BR.png')),
-              'w_knight': pygame.image.load(os.path.join('images', 'WN.png')),
-              'b_knight': pygame.image.load(os.path.join('images', 'BN.png')),
-              'w_bishop': pygame.image.load(os.path.join('images', 'WB.png')),
-              'b_bishop': pygame.image.load(os.path.join('images', 'BB.png')),
-              'w_queen': pygame.image.load(os.path.join('images', 'WQ.png')),
-              'b_queen': pygame.image.load(os.path.join('images', 'BQ.png')),
-              'w_king': pygame.image.load(os.path.join('images', 'WK.png')),
-              'b_king': pygame.image.load(os.path.join('images', 'BK.png'))}
+    sprites = assets.Sprites(atlas=args.atlas)
+    IMAGES = sprites.scaled(BOX_SIZE)
 
     first_selection = None
+    buttons = None
     display = True
-    animation = False
+    blinking = False
     game = chess.ChessBoard()
+    player = None
+    if args.computer:
+        player = EnginePlayer(args.computer, args.depth, args.time)
+        if game.turn == player.color:
+            player.think(game)
+    thinking = player is not None and player.thinking()
+    draw(game, first_selection, buttons, display, thinking)
+    shown = snapshot(game)
 
     while True:
-        mouse_clicked = False
-        chess_board = game.get_board()
-        DISPLAYSURF.fill(BACKGROUND)
-        draw_board()
-
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if event.type == MOUSEBUTTONUP:
-                mouse_pos = event.pos
-                mouse_clicked = True
-                box = get_box_at_pixel(mouse_pos)
-
-        if mouse_clicked is True:
-            if box != (None, None):
-                if first_selection is None:
-                    first_selection = box
-                else:
-                    game.move_piece(first_selection, box)
-                    first_selection = None
-
-        if first_selection:
-            left, top = left_top_coords_of_box(first_selection)
-            selected_box = pygame.Rect(left, top, BOX_SIZE, BOX_SIZE)
-            pygame.draw.rect(DISPLAYSURF, RED, selected_box, 5)
-
-        if game.promotion_allowed():
-            color = game.promotion_color()
-            piece = ask_promotion(color)
-            game.set_pawn_promotion(piece)
-
-        draw_pieces(chess_board)
-
-        if game.white_win() or game.black_win() or game.stalemate():
-            status = game.get_game_status()
-            winning_animation(display, status)
+        # Sleep until something happens; the status of a finished game
+        # blinks on a timer instead of by waiting inside the loop.
+        event = pygame.event.wait()
+        if event.type == QUIT:
+            if player is not None:
+                player.cancel()
+            pygame.quit()
+            sys.exit()
+
+        selection = first_selection
+        had_buttons = buttons is not None
+        if event.type == BLINK_EVENT:
             display = not display
-            animation = True
-
-        pygame.display.update()
-
-        if animation:
-            pygame.time.wait(500)
-
-        FPSCLOCK.tick(FPS)
+        elif event.type == VIDEORESIZE:
+            DISPLAYSURF = pygame.display.set_mode(event.size, RESIZABLE)
+            layout(*event.size)
+            BOARD_SURFACE = board_surface(BOX_SIZE)
+            IMAGES = sprites.scaled(BOX_SIZE)
+            if buttons:
+                buttons = promotion_buttons()
+        elif event.type == ENGINE_EVENT:
+            move = player.result(event)
+            if move is None:
+                continue
+            play_move(game, move)
+            first_selection = None
+            if not game_over(game):
+                player.ponder(game, player.pv)
+        elif event.type == MOUSEBUTTONUP:
+            if not human_turn(game, player, buttons):
+                continue
+            state = click(game, event.pos, first_selection, buttons)
+            if state is None:
+                continue
+            first_selection, buttons = state
+            if (player is not None and game.turn == player.color and
+                    not buttons and not game_over(game)):
+                player.think(game)
+        elif event.type != VIDEOEXPOSE:
+            continue
+        if game_over(game) and not blinking:
+            pygame.time.set_timer(BLINK_EVENT, BLINK_INTERVAL)
+            blinking = True
+
+        was_thinking = thinking
+        thinking = player is not None and player.thinking()
+        if (event.type in (VIDEOEXPOSE, VIDEORESIZE) or
+                had_buttons != (buttons is not None)):
+            draw(game, first_selection, buttons, display, thinking)
+        else:
+            boxes = changed_boxes(game.get_board(), shown)
+            for box in (selection, first_selection):
+                if box is not None and box not in boxes:
+                    boxes.append(box)
+            draw_changes(game, boxes, first_selection, display,
+                         thinking if thinking != was_thinking else None)
+        shown = snapshot(game)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,87 @@
+"""Piece sprites for the GUI and the board renderer.
+
+`Sprites` loads the twelve piece images once, converts them to the
+display format when there is a display and hands out copies scaled to
+any box size. Scaled copies are made once per size, so drawing never
+converts or scales an image. With `atlas` the sprites of every size are
+packed into a single surface and handed out as subsurfaces of it.
+
+"""
+import os
+import pygame
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'images')
+LETTERS = 'PRNBQK'
+
+
+def image_name(symbol):
+    """Return the file name of the image of the piece with FEN `symbol`."""
+    if symbol.isupper():
+        return 'W%s.png' % symbol
+    return 'B%s.png' % symbol.upper()
+
+
+def convert(surface):
+    """Convert `surface` to the display format, which needs a display mode
+    to be set.
+
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    return surface.convert_alpha()
+
+
+def pack(images):
+    """Copy `images` side by side into one surface and return subsurfaces
+    of it under the same keys.
+
+    """
+    keys = sorted(images)
+    width = sum(images[key].get_width() for key in keys)
+    height = max(images[key].get_height() for key in keys)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    rects = {}
+    left = 0
+    for key in keys:
+        image = images[key]
+        # The atlas is transparent black, so taking the maximum copies
+        # the image as it is instead of blending it.
+        atlas.blit(image, (left, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        rects[key] = pygame.Rect((left, 0), image.get_size())
+        left += image.get_width()
+    atlas = convert(atlas)
+    return dict((key, atlas.subsurface(rect)) for key, rect in rects.items())
+
+
+class Sprites:
+    """The piece images by FEN symbol, at any size."""
+
+    def __init__(self, directory=IMAGE_DIR, atlas=False):
+        self.directory = directory
+        self.atlas = atlas
+        self.images = {}
+        self.cache = {}
+        for letter in LETTERS:
+            for symbol in (letter, letter.lower()):
+                image = pygame.image.load(os.path.join(directory,
+                                                       image_name(symbol)))
+                self.images[symbol] = convert(image)
+        if atlas:
+            self.images = pack(self.images)
+
+    def scaled(self, size):
+        """Return the sprites scaled to `size` pixels square by symbol."""
+        sprites = self.cache.get(size)
+        if sprites is None:
+            sprites = {}
+            for symbol, image in self.images.items():
+                if image.get_size() == (size, size):
+                    sprites[symbol] = image
+                else:
+                    sprites[symbol] = convert(pygame.transform.smoothscale(
+                        image, (size, size)))
+            if self.atlas:
+                sprites = pack(sprites)
+            self.cache[size] = sprites
+        return sprites
@@ -0,0 +1,74 @@
+"""Bounded cache of per-position results keyed by `position_hash`.
+
+A `PositionCache` can be shared by any number of `ChessBoard` objects,
+e.g. every game on a server, so that positions which come up again, like
+common openings, are only analysed once.
+
+"""
+from collections import OrderedDict
+
+
+class PositionCache:
+    """Least recently used cache of `(moves, status)` entries.
+
+    `moves` is the tuple of legal moves of a position and `status` the
+    game status it implies. The cache holds at most `max_entries`
+    positions and, if `max_moves` is given, at most that many moves in
+    total, which bounds its memory use. The least recently used entries
+    are evicted first.
+
+    """
+
+    def __init__(self, max_entries=100000, max_moves=None):
+        if max_entries < 1:
+            raise ValueError('max_entries must be positive')
+        self.max_entries = max_entries
+        self.max_moves = max_moves
+        self.entries = OrderedDict()
+        self.moves = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the entry stored for `key` or `None`."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, moves, status):
+        moves = tuple(moves)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.moves -= len(old[0])
+        self.entries[key] = moves, status
+        self.moves += len(moves)
+
+        while len(self.entries) > self.max_entries or (
+                self.max_moves is not None and self.moves > self.max_moves and
+                len(self.entries) > 1):
+            key, (moves, status) = self.entries.popitem(last=False)
+            self.moves -= len(moves)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.moves = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return self.hits / lookups
+
+    def stats(self):
+        return {'entries': len(self.entries), 'moves': self.moves,
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hit_rate()}
@@ -0,0 +1,66 @@
+import unittest
+import chess
+import cache
+
+
+class PositionCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = cache.PositionCache(max_entries=2)
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get(1))
+        self.cache.put(1, [((4, 6), (4, 4), None)], 'Game in progress.')
+        result = self.cache.get(1)
+        self.assertEqual(((((4, 6), (4, 4), None),), 'Game in progress.'),
+                         result)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(0.5, self.cache.hit_rate())
+
+    def test_eviction(self):
+        self.cache.put(1, (), 'Stalemate!')
+        self.cache.put(2, (), 'Stalemate!')
+        self.cache.get(1)
+        self.cache.put(3, (), 'Stalemate!')
+        self.assertEqual(2, len(self.cache))
+        self.assertIsNone(self.cache.get(2))
+        self.assertIsNotNone(self.cache.get(1))
+        self.assertEqual(1, self.cache.evictions)
+
+    def test_max_moves(self):
+        moves_cache = cache.PositionCache(max_moves=3)
+        moves_cache.put(1, [None, None], 'Game in progress.')
+        moves_cache.put(2, [None, None], 'Game in progress.')
+        self.assertEqual(1, len(moves_cache))
+        self.assertEqual(2, moves_cache.moves)
+        self.assertIsNone(moves_cache.get(1))
+
+
+class CachedChessBoardTests(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = cache.PositionCache()
+        self.board = chess.ChessBoard(self.cache)
+
+    def test_legal_moves(self):
+        result = self.board.legal_moves()
+        self.assertEqual(20, len(result))
+        self.assertEqual(1, self.cache.misses)
+        result = chess.ChessBoard(self.cache).legal_moves()
+        self.assertEqual(20, len(result))
+        self.assertEqual(1, self.cache.hits)
+
+    def test_game_status(self):
+        for i in range(2):
+            board = chess.ChessBoard(self.cache)
+            board.move_piece((5, 6), (5, 5))
+            board.move_piece((4, 1), (4, 3))
+            board.move_piece((6, 6), (6, 4))
+            board.move_piece((3, 0), (7, 4))
+            self.assertTrue(board.black_win())
+        self.assertEqual(4, self.cache.hits)
+        self.assertEqual(4, self.cache.misses)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import chess
+import cache
 
 
 class CheckmateTests(unittest.TestCase):
@@ -122,5 +123,38 @@ class CheckmateTests(unittest.TestCase):
         status = 'Black win!'
         self.assertEqual(status, self.board.get_game_status())
 
+
+class CachedCheckmateTests(CheckmateTests):
+
+    def setUp(self):
+        self.board = chess.ChessBoard(cache.PositionCache())
+
+
+class LazyCheckmateTests(CheckmateTests):
+
+    def setUp(self):
+        self.board = chess.ChessBoard(lazy_status=True)
+
+    def test_lazy_status(self):
+        self.board.move_piece((5, 6), (5, 5))
+        self.board.move_piece((4, 1), (4, 3))
+        self.board.move_piece((6, 6), (6, 4))
+        self.board.move_piece((3, 0), (7, 4))
+        self.assertTrue(self.board.status_dirty)
+        self.assertEqual('Game in progress.', self.board.game_status)
+        self.assertTrue(self.board.black_win())
+        self.assertFalse(self.board.status_dirty)
+        self.assertEqual('Black win!', self.board.game_status)
+
+    def test_lazy_status_make_move(self):
+        self.board.make_move(((4, 6), (4, 4), None))
+        self.assertTrue(self.board.status_dirty)
+        self.assertEqual('Game in progress.', self.board.get_game_status())
+        self.board.unmake_move()
+        self.assertFalse(self.board.status_dirty)
+        board = chess.ChessBoard.from_fen('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1',
+                                          lazy_status=True)
+        self.assertTrue(board.stalemate())
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,40 +1,305 @@
+import copy
+import random
+
+
 class Piece:
+    """A chess piece.
+
+    Pieces are immutable flyweights: there is one shared instance per
+    class and color, so `Pawn('white') is Pawn('white')`. State which
+    changes during a game, like castling rights, lives on the board.
+
+    """
+    __slots__ = ('color', 'symbol')
+    letter = None
+    instances = {}
+
+    def __new__(cls, color):
+        piece = Piece.instances.get((cls, color))
+        if piece is None:
+            piece = object.__new__(cls)
+            object.__setattr__(piece, 'color', color)
+            if color == 'white':
+                object.__setattr__(piece, 'symbol', cls.letter.upper())
+            else:
+                object.__setattr__(piece, 'symbol', cls.letter)
+            Piece.instances[cls, color] = piece
+        return piece
 
-    def __init__(self, color):
-        self.color = color
+    def __setattr__(self, name, value):
+        raise AttributeError('pieces are immutable')
 
+    def __reduce__(self):
+        return type(self), (self.color,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.color)
 
-class Pawn(Piece):
 
-    def __init__(self, color):
-        Piece.__init__(self, color)
-        self.moved = False
+class Pawn(Piece):
+    __slots__ = ()
+    letter = 'p'
 
 
 class Bishop(Piece):
-    pass
+    __slots__ = ()
+    letter = 'b'
 
 
 class Queen(Piece):
-    pass
+    __slots__ = ()
+    letter = 'q'
 
 
 class King(Piece):
-
-    def __init__(self, color):
-        Piece.__init__(self, color)
-        self.moved = False
+    __slots__ = ()
+    letter = 'k'
 
 
 class Rook(Piece):
-
-    def __init__(self, color):
-        Piece.__init__(self, color)
-        self.moved = False
+    __slots__ = ()
+    letter = 'r'
 
 
 class Knight(Piece):
-    pass
+    __slots__ = ()
+    letter = 'n'
+
+
+STRAIGHT = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+KNIGHT_JUMPS = ((1, 2), (2, 1), (2, -1), (1, -2),
+                (-1, 2), (-2, 1), (-1, -2), (-2, -1))
+
+
+def piece_attack_table():
+    """Return the `(directions, max_steps)` of the squares every piece
+    attacks.
+
+    """
+    table = {}
+    for color, forward in (('white', -1), ('black', 1)):
+        table[Pawn(color)] = ((1, forward), (-1, forward)), 1
+        table[Knight(color)] = KNIGHT_JUMPS, 1
+        table[Bishop(color)] = DIAGONAL, 8
+        table[Rook(color)] = STRAIGHT, 8
+        table[Queen(color)] = STRAIGHT + DIAGONAL, 8
+        table[King(color)] = STRAIGHT + DIAGONAL, 1
+    return table
+
+
+PIECE_ATTACKS = piece_attack_table()
+
+SLIDERS = frozenset((Bishop, Rook, Queen))
+# Piece classes which attack along a line, by whether it is diagonal.
+LINE_ATTACKERS = {True: frozenset((Bishop, Queen)),
+                  False: frozenset((Rook, Queen))}
+
+
+def square_tables():
+    """Return the per-square lookup tables used by `ChessBoard`.
+
+    `RAY_SQUARES[pos][direction]` holds the squares from `pos` to the edge
+    of the board in one of the eight line directions, nearest first.
+    `KNIGHT_SQUARES[pos]` and `KING_SQUARES[pos]` hold the squares a
+    knight and a king reach from `pos`. `PIECE_RAYS[piece][pos]` holds
+    the non-empty rays `piece` attacks along from `pos`, cut to its range,
+    and `LINE_RAYS[pos]` pairs every line ray from `pos` with the piece
+    classes which attack along it.
+
+    """
+    rays = {}
+    knights = {}
+    kings = {}
+    lines = {}
+    for y in range(8):
+        for x in range(8):
+            square_rays = {}
+            for dx, dy in STRAIGHT + DIAGONAL + KNIGHT_JUMPS:
+                ray = []
+                new_x, new_y = x + dx, y + dy
+                while new_x >= 0 and new_x <= 7 and new_y >= 0 and new_y <= 7:
+                    ray.append((new_x, new_y))
+                    new_x += dx
+                    new_y += dy
+                square_rays[dx, dy] = tuple(ray)
+            knights[x, y] = tuple(square_rays[jump][0]
+                                  for jump in KNIGHT_JUMPS
+                                  if square_rays[jump])
+            for jump in KNIGHT_JUMPS:
+                square_rays[jump] = square_rays[jump][:1]
+            kings[x, y] = tuple(square_rays[direction][0]
+                                for direction in STRAIGHT + DIAGONAL
+                                if square_rays[direction])
+            lines[x, y] = tuple((square_rays[dx, dy],
+                                 LINE_ATTACKERS[dx != 0 and dy != 0])
+                                for dx, dy in STRAIGHT + DIAGONAL
+                                if square_rays[dx, dy])
+            rays[x, y] = square_rays
+
+    piece_rays = {}
+    for piece, (directions, max_steps) in PIECE_ATTACKS.items():
+        piece_rays[piece] = dict(
+            (pos, tuple(rays[pos][direction][:max_steps]
+                        for direction in directions
+                        if rays[pos][direction]))
+            for pos in rays)
+    return rays, knights, kings, piece_rays, lines
+
+
+RAY_SQUARES, KNIGHT_SQUARES, KING_SQUARES, PIECE_RAYS, LINE_RAYS = \
+    square_tables()
+
+# Castling rights bits: 1 and 2 for the white king and queen side, 4 and
+# 8 for the black ones. Moving from or to one of these squares clears
+# the rights which are not in its mask.
+CASTLING_MASKS = {(4, 7): 15 & ~3, (7, 7): 15 & ~1, (0, 7): 15 & ~2,
+                  (4, 0): 15 & ~12, (7, 0): 15 & ~4, (0, 0): 15 & ~8}
+CASTLING_BITS = {(7, 7): 1, (0, 7): 2, (7, 0): 4, (0, 0): 8}
+
+FEN_PIECES = dict((piece.symbol, piece) for piece in PIECE_ATTACKS)
+
+
+def zobrist_keys():
+    """Return the random keys hashed into `ChessBoard.position_hash`."""
+    generator = random.Random(2014)
+    pieces = {}
+    for piece in (Pawn, Knight, Bishop, Rook, Queen, King):
+        for color in ('white', 'black'):
+            pieces[piece(color)] = [generator.getrandbits(64)
+                                    for i in range(64)]
+    black = generator.getrandbits(64)
+    castling = [generator.getrandbits(64) for i in range(16)]
+    en_passant = [generator.getrandbits(64) for i in range(8)]
+    return pieces, black, castling, en_passant
+
+
+ZOBRIST_PIECES, ZOBRIST_BLACK, ZOBRIST_CASTLING, ZOBRIST_EN_PASSANT = \
+    zobrist_keys()
+
+PIECE_VALUES = {Pawn: 100, Knight: 320, Bishop: 330,
+                Rook: 500, Queen: 900, King: 0}
+
+# Middlegame piece-square tables from white's side, indexed by
+# `y * 8 + x` like the board, so the first row is the eighth rank.
+MIDDLEGAME_TABLES = {
+    Pawn: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0),
+    Knight: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    Bishop: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    Rook: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0),
+    Queen: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20),
+    King: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20),
+}
+
+# Endgame tables differ for pawns, which are worth more the further they
+# are, and for the king, which belongs in the centre.
+ENDGAME_TABLES = dict(MIDDLEGAME_TABLES)
+ENDGAME_TABLES[Pawn] = (
+    0, 0, 0, 0, 0, 0, 0, 0,
+    80, 80, 80, 80, 80, 80, 80, 80,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    30, 30, 30, 30, 30, 30, 30, 30,
+    15, 15, 15, 15, 15, 15, 15, 15,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+    0, 0, 0, 0, 0, 0, 0, 0)
+ENDGAME_TABLES[King] = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50)
+
+# Weight of every piece in the game phase, which is `MAX_PHASE` with all
+# the pieces on the board and 0 when only kings and pawns are left.
+PHASE_WEIGHTS = {Pawn: 0, Knight: 1, Bishop: 1, Rook: 2, Queen: 4, King: 0}
+MAX_PHASE = 24
+
+
+def score_tables():
+    """Return the middlegame and endgame scores, material included, of
+    every piece on every square from white's side, indexed by `y * 8 + x`,
+    and the phase weight of every piece.
+
+    """
+    middlegame = {}
+    endgame = {}
+    phases = {}
+    for piece in PIECE_ATTACKS:
+        kind = type(piece)
+        value = PIECE_VALUES[kind]
+        if piece.color == 'white':
+            squares = range(64)
+            sign = 1
+        else:
+            squares = [56 - index + 2 * (index % 8) for index in range(64)]
+            sign = -1
+        middlegame[piece] = tuple(sign * (value + MIDDLEGAME_TABLES[kind][i])
+                                  for i in squares)
+        endgame[piece] = tuple(sign * (value + ENDGAME_TABLES[kind][i])
+                               for i in squares)
+        phases[piece] = PHASE_WEIGHTS[kind]
+    return middlegame, endgame, phases
+
+
+MIDDLEGAME_SCORES, ENDGAME_SCORES, PHASES = score_tables()
 
 
 class ChessBoard:
@@ -45,8 +310,12 @@ class ChessBoard:
     BLACK_WIN = 'Black win!'
     WHITE_WIN = 'White win!'
     STALEMATE = 'Stalemate!'
+    PROMOTION_PIECES = (Queen, Rook, Bishop, Knight)
+    MOVE_METHODS = {Pawn: 'move_pawn', Knight: 'move_knight',
+                    Bishop: 'move_bishop', Rook: 'move_rook',
+                    Queen: 'move_queen', King: 'move_king'}
 
-    def __init__(self):
+    def __init__(self, cache=None, fen=None, lazy_status=False):
         self.board = [[Rook('black'), Knight('black'), Bishop('black'),
                        Queen('black'), King('black'), Bishop('black'),
                        Knight('black'), Rook('black')],
@@ -68,8 +337,147 @@ class ChessBoard:
         self.white_king = (4, 7)
         self.black_king = (4, 0)
         self.game_status = self.GAME_IN_PROGRESS
+        self.lazy_status = lazy_status
+        self.status_dirty = False
         self.pawn_promotion = None
         self.promotion = None
+        self.castling = 15
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.undo_stack = []
+        self.cache = cache
+        if fen is None:
+            self.refresh()
+        else:
+            self.set_fen(fen)
+
+    @classmethod
+    def from_fen(cls, fen, cache=None, lazy_status=False):
+        """Return a board set up from the FEN string `fen`."""
+        return cls(cache, fen, lazy_status)
+
+    def set_fen(self, fen):
+        """Set up the position of the FEN string `fen` on this board.
+
+        The halfmove clock and move number may be left out. The undo stack
+        is cleared and `game_status` is not recomputed unless the board
+        computes it lazily; call `update_game_status` if it is needed.
+        Raises `ValueError` if `fen` is not a valid FEN string.
+
+        """
+        fields = fen.split()
+        if len(fields) == 4:
+            fields += ['0', '1']
+        if len(fields) != 6:
+            raise ValueError('invalid FEN: %r' % fen)
+        placement, turn, castling, en_passant, halfmove, fullmove = fields
+        rows = placement.split('/')
+        if len(rows) != 8 or turn not in ('w', 'b'):
+            raise ValueError('invalid FEN: %r' % fen)
+
+        # Everything is parsed and checked before the board is touched,
+        # so a rejected FEN leaves the position as it was.
+        board = []
+        white_king = black_king = None
+        for y in range(8):
+            row = []
+            for char in rows[y]:
+                if char in '12345678':
+                    row.extend([self.EMPTY] * int(char))
+                    continue
+                piece = FEN_PIECES.get(char)
+                if piece is None or len(row) > 7:
+                    raise ValueError('invalid FEN: %r' % fen)
+                if char in 'Pp' and y in (0, 7):
+                    raise ValueError('FEN with a pawn on a back rank: %r' %
+                                     fen)
+                if char == 'K':
+                    white_king = len(row), y
+                elif char == 'k':
+                    black_king = len(row), y
+                row.append(piece)
+            if len(row) != 8:
+                raise ValueError('invalid FEN: %r' % fen)
+            board.append(row)
+        if white_king is None or black_king is None:
+            raise ValueError('FEN without both kings: %r' % fen)
+
+        castling_rights = 0
+        if castling != '-':
+            for char in castling:
+                bit = 'KQkq'.find(char)
+                if bit < 0:
+                    raise ValueError('invalid FEN: %r' % fen)
+                castling_rights |= 1 << bit
+        if en_passant == '-':
+            en_passant_pos = None
+        elif (len(en_passant) == 2 and en_passant[0] in 'abcdefgh' and
+              en_passant[1] in '36'):
+            x = ord(en_passant[0]) - ord('a')
+            if en_passant[1] == '3':
+                en_passant_pos = x, 4
+                pawn = FEN_PIECES['P']
+            else:
+                en_passant_pos = x, 3
+                pawn = FEN_PIECES['p']
+            if board[en_passant_pos[1]][x] is not pawn:
+                raise ValueError('FEN with an en passant square but no '
+                                 'pawn to take: %r' % fen)
+        else:
+            raise ValueError('invalid FEN: %r' % fen)
+        try:
+            halfmove_clock = int(halfmove)
+            fullmove_number = int(fullmove)
+        except ValueError:
+            raise ValueError('invalid FEN: %r' % fen)
+
+        for y in range(8):
+            self.board[y][:] = board[y]
+        self.castling = castling_rights
+        self.en_passant = en_passant_pos
+        if turn == 'w':
+            self.turn = self.WHITE
+        else:
+            self.turn = self.BLACK
+        self.white_king = white_king
+        self.black_king = black_king
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+        self.game_status = self.GAME_IN_PROGRESS
+        self.status_dirty = self.lazy_status
+        self.promotion = None
+        self.undo_stack = []
+        self.refresh()
+
+    def to_fen(self):
+        """Return the FEN string of the position."""
+        rows = []
+        for row in self.board:
+            text = ''
+            empty = 0
+            for piece in row:
+                if piece is self.EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += piece.symbol
+            if empty:
+                text += str(empty)
+            rows.append(text)
+
+        castling = ''.join(char for bit, char in enumerate('KQkq')
+                           if self.castling & 1 << bit) or '-'
+        if self.en_passant is None:
+            en_passant = '-'
+        else:
+            x, y = self.en_passant
+            en_passant = 'abcdefgh'[x] + ('3' if y == 4 else '6')
+        turn = 'w' if self.turn == self.WHITE else 'b'
+        return '%s %s %s %s %d %d' % ('/'.join(rows), turn, castling,
+                                      en_passant, self.halfmove_clock,
+                                      self.fullmove_number)
 
     def on_board(self, old_pos, new_pos):
         x_new, y_new = new_pos
@@ -91,10 +499,11 @@ class ChessBoard:
         in direction `(dx, dy)` `steps` - 1 positions ahead.
 
         """
-        for i in range(1, steps):
-            x = pos[0] + i * dx
-            y = pos[1] + i * dy
-            if not self.empty((x, y)):
+        ray = RAY_SQUARES[pos][dx, dy]
+        board = self.board
+        for i in range(steps - 1):
+            x, y = ray[i]
+            if board[y][x] is not self.EMPTY:
                 return True
         return False
 
@@ -104,8 +513,15 @@ class ChessBoard:
         return False
 
     def clear_en_passant(self):
+        if self.en_passant is not None:
+            self.position_hash ^= ZOBRIST_EN_PASSANT[self.en_passant[0]]
         self.en_passant = None
 
+    def set_en_passant(self, pos):
+        self.clear_en_passant()
+        self.position_hash ^= ZOBRIST_EN_PASSANT[pos[0]]
+        self.en_passant = pos
+
     def valid_direction(self, old_pos, new_pos):
         """Check if pawns move correctly."""
         if self.player_color(old_pos) == self.WHITE:
@@ -205,7 +621,11 @@ class ChessBoard:
                 return False
         elif abs(new_y - old_y) == 2:
             dx, dy = 0, (new_y > old_y) - (new_y < old_y)
-            return (new_x == old_x and not self.board[old_y][old_x].moved and
+            if self.player_color(old_pos) == self.WHITE:
+                start = 6
+            else:
+                start = 1
+            return (new_x == old_x and old_y == start and
                     not self.obstructions_check(dx, dy, 3, old_pos))
         else:
             return False
@@ -213,63 +633,269 @@ class ChessBoard:
     def king_safe(self, pos, color):
         """Check if the king of `color` is safe from `pos`."""
         x, y = pos
+        board = self.board
+        enemy = self.enemy_color(color)
 
+        pawn = Pawn(enemy)
         if color == self.WHITE:
-            if x < 7 and y > 0 and isinstance(self.board[y - 1][x + 1], Pawn):
-                if self.player_color((x + 1, y - 1)) != self.WHITE:
-                    return False
+            pawn_y = y - 1
+        else:
+            pawn_y = y + 1
+        if pawn_y >= 0 and pawn_y <= 7:
+            if x < 7 and board[pawn_y][x + 1] is pawn:
+                return False
+            if x > 0 and board[pawn_y][x - 1] is pawn:
+                return False
+
+        knight = Knight(enemy)
+        for new_x, new_y in KNIGHT_SQUARES[pos]:
+            if board[new_y][new_x] is knight:
+                return False
 
-            if x > 0 and y > 0 and isinstance(self.board[y - 1][x - 1], Pawn):
-                if self.player_color((x - 1, y - 1)) != self.WHITE:
+        king = King(enemy)
+        for ray, attackers in LINE_RAYS[pos]:
+            for new_x, new_y in ray:
+                piece = board[new_y][new_x]
+                if piece is self.EMPTY:
+                    continue
+                elif piece.color == color:
+                    break
+                elif type(piece) in attackers:
                     return False
-        else:
-            if x < 7 and y < 7 and isinstance(self.board[y + 1][x + 1], Pawn):
-                if self.player_color((x + 1, y + 1)) != self.BLACK:
+                elif piece is king and ray[0] == (new_x, new_y):
                     return False
+                break
+        return True
 
-            if x > 0 and y < 7 and isinstance(self.board[y + 1][x - 1], Pawn):
-                if self.player_color((x - 1, y + 1)) != self.BLACK:
-                    return False
+    def attackers(self, pos, color, removed=()):
+        """Return the positions of the pieces of `color` which attack
+        `pos`, taking the squares in `removed` for empty.
 
-        knight_moves = ((x + 2, y + 1), (x + 2, y - 1), (x - 2, y + 1),
-                        (x - 2, y - 1), (x + 1, y + 2), (x + 1, y - 2),
-                        (x - 1, y + 2), (x - 1, y - 2))
+        """
+        x, y = pos
+        board = self.board
+        found = []
 
-        for move in knight_moves:
-            if self.on_board(pos, move):
-                if isinstance(self.board[move[1]][move[0]], Knight):
-                    if self.player_color(move) != color:
-                        return False
+        pawn = Pawn(color)
+        if color == self.WHITE:
+            pawn_y = y + 1
+        else:
+            pawn_y = y - 1
+        if pawn_y >= 0 and pawn_y <= 7:
+            for pawn_x in (x - 1, x + 1):
+                if pawn_x >= 0 and pawn_x <= 7:
+                    if board[pawn_y][pawn_x] is pawn:
+                        found.append((pawn_x, pawn_y))
+        knight = Knight(color)
+        for new_x, new_y in KNIGHT_SQUARES[pos]:
+            if board[new_y][new_x] is knight:
+                found.append((new_x, new_y))
+        king = King(color)
+        for new_x, new_y in KING_SQUARES[pos]:
+            if board[new_y][new_x] is king:
+                found.append((new_x, new_y))
+        if removed:
+            found = [square for square in found if square not in removed]
+
+        for ray, attackers in LINE_RAYS[pos]:
+            for square in ray:
+                piece = board[square[1]][square[0]]
+                if piece is self.EMPTY or square in removed:
+                    continue
+                if piece.color == color and type(piece) in attackers:
+                    found.append(square)
+                break
+        return found
 
-        directions = ((1, 0), (-1, 0), (0, 1), (0, -1),
-                      (1, 1), (-1, 1), (1, -1), (-1, -1))
+    def enemy_color(self, color):
+        if color == self.WHITE:
+            return self.BLACK
+        else:
+            return self.WHITE
 
-        for direction in directions:
-            new_x, new_y = pos
-            dx, dy = direction
-            steps = 0
-            while(True):
-                steps += 1
-                new_x += dx
-                new_y += dy
-                if new_x < 0 or new_x > 7 or new_y < 0 or new_y > 7:
+    def piece_attacks(self, pos):
+        """Return the positions attacked by the piece at `pos`."""
+        board = self.board
+        attacks = []
+        for ray in PIECE_RAYS[board[pos[1]][pos[0]]][pos]:
+            for new_x, new_y in ray:
+                attacks.append((new_x, new_y))
+                if board[new_y][new_x] is not self.EMPTY:
                     break
-                elif self.empty((new_x, new_y)):
-                    continue
-                elif self.player_color((new_x, new_y)) == color:
-                    break
-                else:
-                    piece = self.board[new_y][new_x]
-                    if isinstance(piece, King) and steps == 1:
-                        return False
-                    elif isinstance(piece, Queen):
-                        return False
-                    elif isinstance(piece, Rook) and abs(dx) != abs(dy):
-                        return False
-                    elif isinstance(piece, Bishop) and abs(dx) == abs(dy):
-                        return False
+        return frozenset(attacks)
+
+    def add_attacks(self, pos):
+        piece = self.board[pos[1]][pos[0]]
+        if piece is self.EMPTY:
+            return
+        attacks = self.piece_attacks(pos)
+        self.attack_sets[pos] = piece.color, attacks
+        attacked = self.attacked[piece.color]
+        for x, y in attacks:
+            attacked[y][x] += 1
+
+    def remove_attacks(self, pos):
+        color, attacks = self.attack_sets.pop(pos, (None, ()))
+        if attacks:
+            attacked = self.attacked[color]
+            for x, y in attacks:
+                attacked[y][x] -= 1
+
+    def sliders_through(self, positions):
+        """Return the positions of the bishops, rooks and queens whose
+        attacks reach any of `positions`.
+
+        """
+        sliders = []
+        for pos, (color, attacks) in self.attack_sets.items():
+            if pos in positions:
+                continue
+            piece = self.board[pos[1]][pos[0]]
+            if type(piece) not in SLIDERS:
+                continue
+            for square in positions:
+                if square in attacks:
+                    sliders.append(pos)
                     break
-        return True
+        return sliders
+
+    def refresh_attacks(self):
+        """Rebuild the attacked-square maps from scratch.
+
+        The maps are kept up to date by `move` and `set_piece`, so this is
+        only needed after writing into `board` directly.
+
+        """
+        self.synced = [list(row) for row in self.board]
+        self.attack_sets = {}
+        self.attacked = {self.WHITE: [[0] * 8 for i in range(8)],
+                         self.BLACK: [[0] * 8 for i in range(8)]}
+        for y in range(8):
+            for x in range(8):
+                self.add_attacks((x, y))
+
+    def castling_rights(self):
+        """Return the castling rights as a bit mask: 1 and 2 for the white
+        king and queen side, 4 and 8 for the black ones.
+
+        """
+        return self.castling
+
+    def castling_pieces(self, rook_pos):
+        """Check if the king and the rook of the castling right of
+        `rook_pos` are on their starting squares.
+
+        """
+        rx, ry = rook_pos
+        if ry == 7:
+            color = self.WHITE
+        else:
+            color = self.BLACK
+        return (self.board[ry][4] is King(color) and
+                self.board[ry][rx] is Rook(color))
+
+    def zobrist_hash(self):
+        """Compute the Zobrist hash of the position from scratch."""
+        position_hash = ZOBRIST_CASTLING[self.castling_rights()]
+        for y in range(8):
+            for x in range(8):
+                piece = self.board[y][x]
+                if piece is not self.EMPTY:
+                    keys = ZOBRIST_PIECES[piece]
+                    position_hash ^= keys[y * 8 + x]
+        if self.turn == self.BLACK:
+            position_hash ^= ZOBRIST_BLACK
+        if self.en_passant is not None:
+            position_hash ^= ZOBRIST_EN_PASSANT[self.en_passant[0]]
+        return position_hash
+
+    def material_scores(self):
+        """Compute the middlegame and endgame scores and the game phase of
+        the position from scratch.
+
+        """
+        middlegame = endgame = phase = 0
+        for y in range(8):
+            for x in range(8):
+                piece = self.board[y][x]
+                if piece is not self.EMPTY:
+                    middlegame += MIDDLEGAME_SCORES[piece][y * 8 + x]
+                    endgame += ENDGAME_SCORES[piece][y * 8 + x]
+                    phase += PHASES[piece]
+        return middlegame, endgame, phase
+
+    def evaluation(self):
+        """Score the position in centipawns from the side to move's view.
+
+        The material and piece-square scores are kept up to date as the
+        pieces move and blended by how many pieces are left, from the
+        middlegame tables with all of them to the endgame tables with only
+        kings and pawns.
+
+        """
+        phase = min(self.phase, MAX_PHASE)
+        score = (self.middlegame * phase +
+                 self.endgame * (MAX_PHASE - phase)) // MAX_PHASE
+        if self.turn == self.WHITE:
+            return score
+        return -score
+
+    def clear_castling(self, pos):
+        """Drop the castling rights which any change on `pos` ends."""
+        mask = CASTLING_MASKS.get(pos)
+        if mask is not None and self.castling & ~mask:
+            self.position_hash ^= (ZOBRIST_CASTLING[self.castling] ^
+                                   ZOBRIST_CASTLING[self.castling & mask])
+            self.castling &= mask
+
+    def refresh(self):
+        """Recompute the attack maps, the position hash and the scores.
+
+        All are kept up to date by the methods which change the position,
+        so this is only needed after writing into `turn`, `en_passant` or
+        `castling` directly; direct writes into `board` are caught by
+        `refresh_if_stale`. Castling rights whose king or rook is not on
+        its starting square are dropped.
+
+        """
+        self.refresh_attacks()
+        self.pin_key = None
+        for rook_pos, bit in CASTLING_BITS.items():
+            if not self.castling_pieces(rook_pos):
+                self.castling &= ~bit
+        self.position_hash = self.zobrist_hash()
+        self.middlegame, self.endgame, self.phase = self.material_scores()
+
+    def refresh_if_stale(self):
+        """Call `refresh` if `board` was written into directly since the
+        attack maps were last updated.
+
+        `synced` mirrors `board` as `move` and `set_piece` leave it, so
+        comparing the two finds writes which bypassed them.
+
+        """
+        if self.board != self.synced:
+            self.refresh()
+
+    def copy(self):
+        """Return an independent copy of the board.
+
+        Pieces are shared flyweights, so only the rows, the attack maps
+        and the undo stack are copied. The copy shares `cache`.
+
+        """
+        board = copy.copy(self)
+        board.board = [list(row) for row in self.board]
+        board.synced = [list(row) for row in self.synced]
+        board.attack_sets = dict(self.attack_sets)
+        board.attacked = dict((color, [list(row) for row in rows])
+                              for color, rows in self.attacked.items())
+        board.undo_stack = list(self.undo_stack)
+        return board
+
+    def square_attacked(self, pos, color):
+        """Check if `pos` is attacked by any piece of `color`."""
+        return self.attacked[color][pos[1]][pos[0]] > 0
 
     def king_guard(self, new_pos, old_pos, piece=None):
         """Check if the king will be safe if there is a move from
@@ -282,6 +908,21 @@ class ChessBoard:
         new = self.board[new_y][new_x]
         special = None
 
+        if old is not self.EMPTY and old.color == self.turn:
+            attacked = self.attacked[self.enemy_color(self.turn)]
+            if piece == 'king':
+                # Only a king in check can be blocking a slider's attack
+                # on the square it steps to.
+                if attacked[new_y][new_x]:
+                    return False
+                if not self.check():
+                    return True
+            elif piece != 'pawn' or self.en_passant != (new_x, old_y):
+                return self.pin_safe(new_pos, old_pos)
+            elif (not attacked[old_y][old_x] and
+                    not attacked[old_y][new_x] and not self.check()):
+                return True
+
         self.board[old_y][old_x] = self.EMPTY
         self.board[new_y][new_x] = old
 
@@ -307,18 +948,92 @@ class ChessBoard:
 
         return guarded
 
+    def pin_state(self):
+        """Return `(pins, checkers, block)` for whoever turn it is.
+
+        `pins` maps the position of every pinned piece to the squares on
+        the line between its king and the pinning piece, which it may
+        move to. `checkers` lists the positions of the pieces giving
+        check and `block` holds the squares which end a single check: the
+        checker and the squares between it and the king. The result is
+        kept until `position_hash` changes.
+
+        """
+        if self.pin_key == self.position_hash:
+            return self.pins
+        board = self.board
+        color = self.turn
+        enemy = self.enemy_color(color)
+        if color == self.WHITE:
+            king_x, king_y = self.white_king
+        else:
+            king_x, king_y = self.black_king
+        pins = {}
+        checkers = []
+        block = []
+
+        for ray, attackers in LINE_RAYS[king_x, king_y]:
+            pinned = None
+            for i, (x, y) in enumerate(ray):
+                piece = board[y][x]
+                if piece is self.EMPTY:
+                    continue
+                if piece.color == color:
+                    if pinned is not None:
+                        break
+                    pinned = x, y
+                    continue
+                if type(piece) in attackers:
+                    if pinned is None:
+                        checkers.append((x, y))
+                        block.extend(ray[:i + 1])
+                    else:
+                        pins[pinned] = frozenset(ray[:i + 1])
+                break
+
+        knight = Knight(enemy)
+        for x, y in KNIGHT_SQUARES[king_x, king_y]:
+            if board[y][x] is knight:
+                checkers.append((x, y))
+                block.append((x, y))
+        pawn = Pawn(enemy)
+        if color == self.WHITE:
+            y = king_y - 1
+        else:
+            y = king_y + 1
+        if y >= 0 and y <= 7:
+            for x in (king_x - 1, king_x + 1):
+                if x >= 0 and x <= 7 and board[y][x] is pawn:
+                    checkers.append((x, y))
+                    block.append((x, y))
+
+        self.pins = pins, checkers, frozenset(block)
+        self.pin_key = self.position_hash
+        return self.pins
+
+    def pin_safe(self, new_pos, old_pos):
+        """Check with `pin_state` if the king will be safe after a move
+        from `old_pos` to `new_pos` of any piece but the king which is not
+        an en passant capture.
+
+        """
+        pins, checkers, block = self.pin_state()
+        if old_pos in pins:
+            return not checkers and new_pos in pins[old_pos]
+        if not checkers:
+            return True
+        return len(checkers) == 1 and new_pos in block
+
     def castle_check(self, king_pos, rook_pos, color):
         """Check if castling for `color` is possible."""
+        self.refresh_if_stale()
         kx, ky = king_pos
         rx, ry = rook_pos
 
-        if self.board[ky][kx].moved:
+        if not self.castling & CASTLING_BITS.get(rook_pos, 0):
             return False
 
-        if not isinstance(self.board[ry][rx], Rook):
-            return False
-
-        if self.board[ry][rx].moved:
+        if not self.castling_pieces(rook_pos):
             return False
 
         if rx > kx:
@@ -331,8 +1046,9 @@ class ChessBoard:
         if self.obstructions_check(dx, dy, steps, king_pos):
             return False
 
+        attacked = self.attacked[self.enemy_color(color)]
         for i in range(3):
-            if not self.king_safe((kx, ky), color):
+            if attacked[ky][kx]:
                 return False
             kx += dx
 
@@ -340,25 +1056,17 @@ class ChessBoard:
 
     def valid_move(self, pos, directions, max_steps=8, piece=None):
         """Check if there is a valid move from `pos` in `directions`."""
-        x, y = pos
+        rays = RAY_SQUARES[pos]
 
         for direction in directions:
-            dx, dy = direction
-            new_x = x
-            new_y = y
             steps = 0
-            while True:
-                new_x += dx
-                new_y += dy
-                if new_x < 0 or new_x > 7 or new_y < 0 or new_y > 7:
+            for new_pos in rays[direction]:
+                target = self.board[new_pos[1]][new_pos[0]]
+                if target is not self.EMPTY and target.color == self.turn:
                     break
-                elif self.empty((new_x, new_y)):
-                    if self.king_guard((new_x, new_y), pos, piece):
-                        return True
-                elif self.player_color((new_x, new_y)) != self.turn:
-                    if self.king_guard((new_x, new_y), pos, piece):
-                        return True
-                else:
+                if self.king_guard(new_pos, pos, piece):
+                    return True
+                if target is not self.EMPTY:
                     break
                 steps += 1
                 if steps == max_steps:
@@ -368,70 +1076,188 @@ class ChessBoard:
 
     def any_valid_moves(self):
         """Check for any valid moves for whoever turn it is."""
+        self.refresh_if_stale()
+        return len(self.generate_legal_moves()) > 0
+
+    def add_moves(self, pos, moves, allowed=None):
+        """Add the moves of the piece at `pos` but pawns and kings to
+        `moves`.
+
+        The king is not checked for safety: only the moves to `allowed`
+        are added unless it is `None`.
+
+        """
+        board = self.board
+        for ray in PIECE_RAYS[board[pos[1]][pos[0]]][pos]:
+            for new_pos in ray:
+                target = board[new_pos[1]][new_pos[0]]
+                if target is not self.EMPTY and target.color == self.turn:
+                    break
+                if allowed is None or new_pos in allowed:
+                    moves.append((pos, new_pos, None))
+                if target is not self.EMPTY:
+                    break
+
+    def add_king_moves(self, pos, moves, in_check):
+        """Add the legal moves of the king at `pos` but castling to
+        `moves`.
+
+        """
+        attacked = self.attacked[self.enemy_color(self.turn)]
+
+        for new_x, new_y in KING_SQUARES[pos]:
+            target = self.board[new_y][new_x]
+            if target is not self.EMPTY and target.color == self.turn:
+                continue
+            if attacked[new_y][new_x]:
+                continue
+            if in_check and not self.king_guard((new_x, new_y), pos, 'king'):
+                continue
+            moves.append((pos, (new_x, new_y), None))
+
+    def add_pawn_moves(self, pos, moves, allowed=None):
+        """Add the moves of the pawn at `pos` to `moves`.
+
+        Like `add_moves`, only the moves to `allowed` are added unless it
+        is `None`, but en passant captures are always checked in full.
+
+        """
+        x, y = pos
+        pawn = self.board[y][x]
+
+        if pawn.color == self.WHITE:
+            dy = -1
+        else:
+            dy = 1
+
+        targets = []
+        if self.empty((x, y + dy)):
+            targets.append((x, y + dy))
+            # Pawns on their starting rank are next to their back rank.
+            if y - dy in (0, 7) and self.empty((x, y + 2 * dy)):
+                targets.append((x, y + 2 * dy))
+        if allowed is not None:
+            targets = [new_pos for new_pos in targets if new_pos in allowed]
+        for new_x in (x - 1, x + 1):
+            if new_x < 0 or new_x > 7:
+                continue
+            target = self.board[y + dy][new_x]
+            if target is self.EMPTY:
+                if self.en_passant == (new_x, y):
+                    if self.king_guard((new_x, y + dy), pos, 'pawn'):
+                        targets.append((new_x, y + dy))
+            elif target.color != pawn.color:
+                if allowed is None or (new_x, y + dy) in allowed:
+                    targets.append((new_x, y + dy))
+
+        for new_pos in targets:
+            if new_pos[1] == 0 or new_pos[1] == 7:
+                for promotion in self.PROMOTION_PIECES:
+                    moves.append((pos, new_pos, promotion))
+            else:
+                moves.append((pos, new_pos, None))
+
+    def legal_moves(self):
+        """Return every legal move for whoever turn it is.
+
+        Moves are `(old_pos, new_pos, promotion)` tuples where `promotion`
+        is the piece class a pawn reaching the last rank becomes and `None`
+        for every other move. Castling is a king move of two squares.
+
+        """
+        self.refresh_if_stale()
+        if self.cache is not None:
+            return list(self.cached_position()[0])
+        return self.generate_legal_moves()
+
+    def cached_position(self):
+        """Return the legal moves and the game status of the position,
+        looking them up in `cache` by `position_hash` first.
+
+        """
+        entry = self.cache.get(self.position_hash)
+        if entry is None:
+            moves = self.generate_legal_moves()
+            entry = tuple(moves), self.mate_status(moves)
+            self.cache.put(self.position_hash, *entry)
+        return entry
+
+    def mate_status(self, moves):
+        """Return the game status when whoever turn it is has `moves`."""
+        if moves:
+            return self.GAME_IN_PROGRESS
+        if self.check():
+            if self.turn == self.WHITE:
+                return self.BLACK_WIN
+            else:
+                return self.WHITE_WIN
+        return self.STALEMATE
+
+    def generate_legal_moves(self):
+        """Generate the list returned by `legal_moves`.
+
+        Pins and checks are found once with `pin_state`, so only king
+        moves and en passant captures need a full safety test.
+
+        """
         color = self.turn
-        move = False
-        moved = None
+        moves = []
+        pins, checkers, block = self.pin_state()
+        in_check = len(checkers) > 0
+        if not in_check:
+            block = None
 
         for y in range(8):
             for x in range(8):
                 piece = self.board[y][x]
-                if not self.empty((x, y)) and piece.color == color:
-                    if isinstance(piece, Queen):
-                        directions = ((1, 0), (-1, 0), (0, 1), (0, -1),
-                                      (1, 1), (-1, 1), (1, -1), (-1, -1))
-                        move = self.valid_move((x, y), directions)
-                    elif isinstance(piece, Rook):
-                        directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
-                        move = self.valid_move((x, y), directions)
-                    elif isinstance(piece, Bishop):
-                        directions = ((1, 1), (-1, 1), (1, -1), (-1, -1))
-                        move = self.valid_move((x, y), directions)
-                    elif isinstance(piece, King):
-                        directions = ((1, 0), (-1, 0), (0, 1), (0, -1),
-                                      (1, 1), (-1, 1), (1, -1), (-1, -1))
-                        move = self.valid_move((x, y), directions, 1, 'king')
-                        if self.castle_check((x, y), (x + 3, y), color):
-                            move = True
-                        elif self.castle_check((x, y), (x - 4, y), color):
-                            move = True
-                    elif isinstance(piece, Knight):
-                        positions = ((x + 1, y + 2), (x + 2, y + 1),
-                                     (x + 2, y - 1), (x + 1, y - 2),
-                                     (x - 1, y + 2), (x - 2, y + 1),
-                                     (x - 1, y - 2), (x - 2, y - 1))
-                        for px, py in positions:
-                            if px >= 0 and px <= 7 and py >= 0 and py <= 7:
-                                if not self.same_color((x, y), (px, py)):
-                                    if self.king_guard((px, py), (x, y)):
-                                        move = True
-                                        break
-                    elif isinstance(piece, Pawn):
-                        if color == self.WHITE:
-                            positions = ((x, y - 1),
-                                         (x + 1, y - 1), (x - 1, y - 1))
-                        else:
-                            positions = ((x, y + 1),
-                                         (x + 1, y + 1), (x - 1, y + 1))
-                        for px, py in positions:
-                            if px <= 7 and px >= 0 and py <= 7 and py >= 0:
-                                if not self.same_color((x, y), (px, py)):
-                                    if self.valid_pawn_move((x, y), (px, py)):
-                                        move = True
-                                        break
-                if move:
-                    return True
+                if piece is self.EMPTY or piece.color != color:
+                    continue
+                kind = type(piece)
+                if kind is King:
+                    self.add_king_moves((x, y), moves, in_check)
+                    if self.castle_check((x, y), (7, y), color):
+                        moves.append(((x, y), (x + 2, y), None))
+                    if self.castle_check((x, y), (0, y), color):
+                        moves.append(((x, y), (x - 2, y), None))
+                    continue
+                if len(checkers) > 1:
+                    continue
+                if (x, y) in pins:
+                    if in_check:
+                        continue
+                    allowed = pins[x, y]
+                else:
+                    allowed = block
+                if kind is Pawn:
+                    self.add_pawn_moves((x, y), moves, allowed)
+                else:
+                    self.add_moves((x, y), moves, allowed)
 
-        return False
+        return moves
 
     def check(self):
+        self.refresh_if_stale()
         if self.turn == self.WHITE:
             king_pos = self.white_king
         else:
             king_pos = self.black_king
 
-        return not self.king_safe(king_pos, self.turn)
+        return self.square_attacked(king_pos, self.enemy_color(self.turn))
+
+    def update_clocks(self, piece, capture):
+        """Advance the halfmove clock and move number after a move of
+        `piece`, which captured something if `capture` is true.
+
+        """
+        if capture or type(piece) is Pawn:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece.color == self.BLACK:
+            self.fullmove_number += 1
 
     def switch_turn(self):
+        self.position_hash ^= ZOBRIST_BLACK
         if self.turn == self.WHITE:
             self.turn = self.BLACK
         else:
@@ -443,10 +1269,64 @@ class ChessBoard:
     def move(self, old_pos, new_pos):
         new_x, new_y = new_pos
         old_x, old_y = old_pos
-        self.board[new_y][new_x] = self.board[old_y][old_x]
+        piece = self.board[old_y][old_x]
+        captured = self.board[new_y][new_x]
+        old_index = old_y * 8 + old_x
+        new_index = new_y * 8 + new_x
+        keys = ZOBRIST_PIECES[piece]
+        self.position_hash ^= keys[old_index] ^ keys[new_index]
+        scores = MIDDLEGAME_SCORES[piece]
+        self.middlegame += scores[new_index] - scores[old_index]
+        scores = ENDGAME_SCORES[piece]
+        self.endgame += scores[new_index] - scores[old_index]
+        if captured is not self.EMPTY:
+            keys = ZOBRIST_PIECES[captured]
+            self.position_hash ^= keys[new_index]
+            self.middlegame -= MIDDLEGAME_SCORES[captured][new_index]
+            self.endgame -= ENDGAME_SCORES[captured][new_index]
+            self.phase -= PHASES[captured]
+
+        sliders = self.sliders_through((old_pos, new_pos))
+        self.remove_attacks(old_pos)
+        self.remove_attacks(new_pos)
+        self.board[new_y][new_x] = piece
         self.board[old_y][old_x] = self.EMPTY
+        self.synced[new_y][new_x] = piece
+        self.synced[old_y][old_x] = self.EMPTY
+        self.add_attacks(new_pos)
+        for pos in sliders:
+            self.remove_attacks(pos)
+            self.add_attacks(pos)
+        self.clear_castling(old_pos)
+        self.clear_castling(new_pos)
         return True
 
+    def set_piece(self, pos, piece):
+        """Put `piece` on `pos`, or clear `pos` if `piece` is `EMPTY`."""
+        x, y = pos
+        index = y * 8 + x
+        old = self.board[y][x]
+        if old is not self.EMPTY:
+            self.position_hash ^= ZOBRIST_PIECES[old][index]
+            self.middlegame -= MIDDLEGAME_SCORES[old][index]
+            self.endgame -= ENDGAME_SCORES[old][index]
+            self.phase -= PHASES[old]
+        if piece is not self.EMPTY:
+            self.position_hash ^= ZOBRIST_PIECES[piece][index]
+            self.middlegame += MIDDLEGAME_SCORES[piece][index]
+            self.endgame += ENDGAME_SCORES[piece][index]
+            self.phase += PHASES[piece]
+
+        sliders = self.sliders_through((pos,))
+        self.remove_attacks(pos)
+        self.board[y][x] = piece
+        self.synced[y][x] = piece
+        self.add_attacks(pos)
+        for slider in sliders:
+            self.remove_attacks(slider)
+            self.add_attacks(slider)
+        self.clear_castling(pos)
+
     def move_queen(self, old_pos, new_pos):
         if not self.valid_queen_move(old_pos, new_pos):
             return False
@@ -468,7 +1348,6 @@ class ChessBoard:
             return False
 
         self.clear_en_passant()
-        self.board[old_pos[1]][old_pos[0]].moved = True
 
         return self.move(old_pos, new_pos)
 
@@ -488,10 +1367,8 @@ class ChessBoard:
             return False
 
         if new_x == old_x + 2:
-            self.board[new_y][7].moved = True
             self.move((7, new_y), (5, new_y))
         elif new_x == old_x - 2:
-            self.board[new_y][0].moved = True
             self.move((0, new_y), (3, new_y))
 
         if self.turn == self.WHITE:
@@ -500,7 +1377,6 @@ class ChessBoard:
             self.black_king = new_pos
 
         self.clear_en_passant()
-        self.board[old_y][old_x].moved = True
 
         return self.move(old_pos, new_pos)
 
@@ -518,23 +1394,22 @@ class ChessBoard:
             if new_x > 0:
                 left = new_x - 1, new_y
                 if not (self.empty(left) and self.same_color(old_pos, left)):
-                    self.en_passant = new_pos
+                    self.set_en_passant(new_pos)
             if new_x < 7:
                 right = new_x + 1, new_y
                 if not (self.empty(right) and self.same_color(old_pos, right)):
-                    self.en_passant = new_pos
+                    self.set_en_passant(new_pos)
         elif abs(new_x - old_x) == abs(new_y - old_y):
             if self.empty(new_pos):
-                self.board[old_y][new_x] = self.EMPTY
+                self.set_piece((new_x, old_y), self.EMPTY)
 
         if self.en_passant != new_pos:
             self.clear_en_passant()
 
-        self.board[old_y][old_x].moved = True
-
         return self.move(old_pos, new_pos)
 
     def move_piece(self, old_pos, new_pos):
+        self.refresh_if_stale()
         if self.empty(old_pos):
             return False
 
@@ -551,27 +1426,36 @@ class ChessBoard:
             return False
 
         piece = self.board[old_pos[1]][old_pos[0]]
+        capture = not self.empty(new_pos)
 
-        if isinstance(piece, Pawn):
-            if not self.move_pawn(old_pos, new_pos):
-                return False
-        elif isinstance(piece, Rook):
-            if not self.move_rook(old_pos, new_pos):
-                return False
-        elif isinstance(piece, Bishop):
-            if not self.move_bishop(old_pos, new_pos):
-                return False
-        elif isinstance(piece, Knight):
-            if not self.move_knight(old_pos, new_pos):
-                return False
-        elif isinstance(piece, Queen):
-            if not self.move_queen(old_pos, new_pos):
-                return False
-        elif isinstance(piece, King):
-            if not self.move_king(old_pos, new_pos):
-                return False
+        move_method = getattr(self, self.MOVE_METHODS[type(piece)])
+        if not move_method(old_pos, new_pos):
+            return False
 
+        self.update_clocks(piece, capture)
         self.switch_turn()
+        self.status_changed()
+
+        return True
+
+    def status_changed(self):
+        """Update `game_status` after the position changed or, if the
+        board computes it lazily, leave that to the next `get_game_status`.
+
+        """
+        if self.lazy_status:
+            self.status_dirty = True
+        else:
+            self.update_game_status()
+
+    def update_game_status(self):
+        self.refresh_if_stale()
+        self.status_dirty = False
+        if self.cache is not None:
+            status = self.cached_position()[1]
+            if status != self.GAME_IN_PROGRESS:
+                self.game_status = status
+            return
 
         if not self.any_valid_moves():
             if self.check():
@@ -582,9 +1466,110 @@ class ChessBoard:
             else:
                 self.game_status = self.STALEMATE
 
-        return True
+    def make_move(self, move):
+        """Play `move`, a tuple returned by `legal_moves`, and push what is
+        needed to take it back with `unmake_move`.
+
+        The move is not validated and `game_status` is left as it was,
+        unless the board computes it lazily; call `update_game_status` if
+        it is needed.
+
+        """
+        (old_x, old_y), (new_x, new_y), promotion = move
+        piece = self.board[old_y][old_x]
+        captured = self.board[new_y][new_x]
+        captured_pos = new_x, new_y
+        if type(piece) is Pawn and captured is self.EMPTY:
+            if new_x != old_x:
+                captured_pos = new_x, old_y
+                captured = self.board[old_y][new_x]
+
+        self.undo_stack.append((move, piece, captured, captured_pos,
+                                self.en_passant, self.white_king,
+                                self.black_king, self.promotion,
+                                self.game_status, self.status_dirty,
+                                self.castling,
+                                self.halfmove_clock, self.fullmove_number,
+                                self.position_hash))
+
+        self.clear_en_passant()
+        if type(piece) is Pawn:
+            if captured_pos != (new_x, new_y):
+                self.set_piece(captured_pos, self.EMPTY)
+            elif abs(new_y - old_y) == 2:
+                self.set_en_passant((new_x, new_y))
+        elif type(piece) is King:
+            if new_x == old_x + 2:
+                self.move((7, new_y), (5, new_y))
+            elif new_x == old_x - 2:
+                self.move((0, new_y), (3, new_y))
+            if piece.color == self.WHITE:
+                self.white_king = new_x, new_y
+            else:
+                self.black_king = new_x, new_y
+
+        self.move(move[0], move[1])
+        if promotion is not None:
+            self.set_piece(move[1], promotion(piece.color))
+        self.update_clocks(piece, captured is not self.EMPTY)
+        self.switch_turn()
+        self.status_dirty = self.lazy_status
+
+    def unmake_move(self):
+        """Take back the last move played with `make_move`."""
+        (move, piece, captured, captured_pos, self.en_passant,
+         self.white_king, self.black_king, self.promotion, self.game_status,
+         self.status_dirty, castling, self.halfmove_clock,
+         self.fullmove_number, position_hash) = self.undo_stack.pop()
+        (old_x, old_y), (new_x, new_y), promotion = move
+
+        self.switch_turn()
+        self.move(move[1], move[0])
+        if promotion is not None:
+            self.set_piece(move[0], piece)
+        if captured is not self.EMPTY:
+            self.set_piece(captured_pos, captured)
+
+        if type(piece) is King:
+            if new_x == old_x + 2:
+                self.move((5, new_y), (7, new_y))
+            elif new_x == old_x - 2:
+                self.move((3, new_y), (0, new_y))
+
+        self.castling = castling
+        self.position_hash = position_hash
+
+    def make_null_move(self):
+        """Pass the turn to the other side without moving, as a search does
+        to test whether a position is good enough without a move. Take it
+        back with `unmake_null_move` before anything else.
+
+        """
+        self.undo_stack.append((None, self.en_passant, self.game_status,
+                                self.status_dirty, self.halfmove_clock,
+                                self.fullmove_number, self.position_hash))
+        self.clear_en_passant()
+        self.halfmove_clock += 1
+        if self.turn == self.BLACK:
+            self.fullmove_number += 1
+        self.switch_turn()
+        self.status_dirty = self.lazy_status
+
+    def unmake_null_move(self):
+        """Take back the last `make_null_move`."""
+        (move, self.en_passant, self.game_status, self.status_dirty,
+         self.halfmove_clock, self.fullmove_number,
+         position_hash) = self.undo_stack.pop()
+        self.switch_turn()
+        self.position_hash = position_hash
 
     def get_game_status(self):
+        """Return `game_status`, computing it first if the board computes
+        it lazily and it is out of date.
+
+        """
+        if self.status_dirty:
+            self.update_game_status()
         return self.game_status
 
     def white_win(self):
@@ -597,21 +1582,19 @@ class ChessBoard:
         return self.get_game_status() == self.STALEMATE
 
     def get_board(self):
+        """Return the rows of the board, indexed `[y][x]`.
+
+        Writing into them directly is allowed: the attack maps, position
+        hash and scores are refreshed the next time a move is generated or
+        `check` is asked. Call `refresh` to have them right at once.
+
+        """
         return self.board
 
     def set_pawn_promotion(self, piece):
-        x, y = self.promotion
-        self.board[y][x] = piece
+        self.set_piece(self.promotion, piece)
         self.promotion = None
-
-        if not self.any_valid_moves():
-            if self.check():
-                if self.turn == self.WHITE:
-                    self.game_status = self.BLACK_WIN
-                else:
-                    self.game_status = self.WHITE_WIN
-            else:
-                self.game_status = self.STALEMATE
+        self.status_changed()
 
     def promotion_allowed(self):
         return self.promotion is not None
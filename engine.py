@@ -0,0 +1,607 @@
+"""Alpha-beta search over `chess.ChessBoard` positions.
+
+`Engine.search` runs an iterative deepening negamax search with
+alpha-beta pruning and stops at the first of its depth, node and time
+limits. At the horizon a quiescence search plays out the captures and
+promotions which do not lose material by static exchange evaluation, so
+positions are only scored when they are quiet, by the material and
+piece-square scores the board keeps up to date. Moves are searched best
+first by the heuristics in `ORDERINGS` and the tree is shaped by the
+techniques in `SELECTIVITY`; run `python engine.py --help` to compare
+their node counts on the perft positions.
+
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import chess
+import perft
+
+MATE = 100000
+
+# Move ordering heuristics: the best move found in the position before,
+# captures by most valuable victim and least valuable attacker, quiet
+# moves which caused a cutoff at the same ply and quiet moves by how
+# often they caused cutoffs anywhere.
+ORDERINGS = ('hash', 'mvv_lva', 'killers', 'history')
+
+# Selective search: cut off nodes where passing the move still fails
+# high, search quiet moves late in the move list less deep and moves
+# which give check a ply deeper.
+SELECTIVITY = ('null_move', 'reductions', 'check_extensions')
+
+NULL_MOVE_REDUCTION = 2
+REDUCED_MOVES = 3
+
+PIECE_VALUES = chess.PIECE_VALUES
+
+# Piece values for `see`, where the king may only take last.
+SEE_VALUES = dict(PIECE_VALUES)
+SEE_VALUES[chess.King] = MATE
+
+
+def evaluate(board):
+    """Score the position in centipawns from the side to move's view."""
+    return board.evaluation()
+
+
+def is_capture(board, move):
+    """Return whether `move` captures, en passant included, or promotes."""
+    (old_x, old_y), (new_x, new_y), promotion = move
+    if promotion is not None or board.board[new_y][new_x] is not board.EMPTY:
+        return True
+    return (type(board.board[old_y][old_x]) is chess.Pawn and
+            old_x != new_x)
+
+
+def see(board, move):
+    """Return the material the side to move wins by `move` if both sides
+    then keep taking on its target square with their least valuable
+    attacker for as long as that pays.
+
+    Pieces behind the ones which have taken are found as attackers too,
+    pins are not looked at.
+
+    """
+    (old_x, old_y), target, promotion = move
+    new_x, new_y = target
+    piece = board.board[old_y][old_x]
+    victim = board.board[new_y][new_x]
+    removed = set([(old_x, old_y)])
+    if victim is not board.EMPTY:
+        gains = [SEE_VALUES[type(victim)]]
+    elif type(piece) is chess.Pawn and old_x != new_x:
+        gains = [SEE_VALUES[chess.Pawn]]
+        removed.add((new_x, old_y))
+    else:
+        gains = [0]
+    value = SEE_VALUES[type(piece)]
+    if promotion is not None:
+        gains[0] += SEE_VALUES[promotion] - value
+        value = SEE_VALUES[promotion]
+
+    color = board.enemy_color(piece.color)
+    while True:
+        attackers = board.attackers(target, color, removed)
+        if not attackers:
+            break
+        square = min(attackers, key=lambda square: SEE_VALUES[
+            type(board.board[square[1]][square[0]])])
+        gains.append(value - gains[-1])
+        value = SEE_VALUES[type(board.board[square[1]][square[0]])]
+        removed.add(square)
+        color = board.enemy_color(color)
+
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
+
+
+class SearchResult:
+    """Outcome of `Engine.search`.
+
+    `best_move` is `None` only when the side to move has no legal moves.
+    `pv` is the principal variation starting with `best_move`, `score`
+    is in centipawns from the side to move's view and `depth` is the last
+    fully searched depth.
+
+    """
+
+    def __init__(self, best_move, score, pv, depth, nodes, elapsed):
+        self.best_move = best_move
+        self.score = score
+        self.pv = pv
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return ('SearchResult(best_move=%r, score=%d, depth=%d, nodes=%d)' %
+                (self.best_move, self.score, self.depth, self.nodes))
+
+
+class Engine:
+    """Negamax alpha-beta searcher with iterative deepening.
+
+    The limits given to the constructor are defaults for `search`;
+    `None` means no limit, except for `max_depth`. With `quiescence`
+    false the search scores the positions at the horizon as they stand.
+    `ordering` and `selectivity` pick from `ORDERINGS` and `SELECTIVITY`.
+
+    """
+
+    def __init__(self, max_depth=6, time_limit=None, node_limit=None,
+                 ordering=ORDERINGS, table_size=100000, quiescence=True,
+                 selectivity=SELECTIVITY):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.ordering = frozenset(ordering)
+        self.table_size = table_size
+        self.use_quiescence = quiescence
+        self.selectivity = frozenset(selectivity)
+        self.hash_moves = {}
+        self.history = {}
+        self.killers = []
+        self.reset_stats()
+        self.stopped = False
+        self.cancelled = False
+        self.limits = False
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.null_move_cutoffs = 0
+        self.reductions = 0
+        self.re_searches = 0
+        self.extensions = 0
+
+    def stats(self):
+        """Return the node and beta cutoff counts of the last search.
+
+        `nodes` includes the `quiescence_nodes`. `first_move_cutoff_rate`
+        is the share of cutoffs caused by the first move searched, which is
+        higher the better moves are ordered. `reductions` counts the moves
+        searched less deep, `re_searches` those of them searched again at
+        full depth because they beat alpha, and `extensions` the moves
+        searched a ply deeper for giving check.
+
+        """
+        rate = self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+        return {'nodes': self.nodes,
+                'quiescence_nodes': self.quiescence_nodes,
+                'cutoffs': self.cutoffs,
+                'first_move_cutoffs': self.first_move_cutoffs,
+                'first_move_cutoff_rate': rate,
+                'null_move_cutoffs': self.null_move_cutoffs,
+                'reductions': self.reductions,
+                're_searches': self.re_searches,
+                'extensions': self.extensions}
+
+    def search(self, board, max_depth=None, time_limit=None,
+               node_limit=None):
+        """Search `board` and return a `SearchResult`.
+
+        The board is left in the position it was given in. The limits
+        apply once the first root move has been searched; if they stop
+        depth one, the best move found so far is returned with depth 0.
+
+        """
+        if max_depth is None:
+            max_depth = self.max_depth
+        if time_limit is None:
+            time_limit = self.time_limit
+        if node_limit is None:
+            node_limit = self.node_limit
+
+        start = time.time()
+        self.deadline = None if time_limit is None else start + time_limit
+        self.max_nodes = node_limit
+        self.max_ply = 2 * max_depth
+        self.reset_stats()
+        self.stopped = False
+        self.killers = [[None, None] for i in range(max_depth + 1)]
+        for key in self.history:
+            self.history[key] //= 2
+
+        result = SearchResult(None, 0, [], 0, 0, 0.0)
+        moves = board.legal_moves()
+        if not moves:
+            result.score = self.terminal_score(board, 0)
+            return result
+        moves = self.order_moves(board, moves, 0,
+                                 self.hash_moves.get(board.position_hash))
+
+        self.limits = False
+        for depth in range(1, max_depth + 1):
+            pv = []
+            score = self.root(board, moves, depth, pv)
+            if self.stopped:
+                if depth == 1 and pv:
+                    result = SearchResult(pv[0], score, pv, 0, self.nodes,
+                                          time.time() - start)
+                break
+            result = SearchResult(pv[0], score, pv, depth, self.nodes,
+                                  time.time() - start)
+            self.store_hash_move(board, pv[0])
+            moves.remove(pv[0])
+            moves.insert(0, pv[0])
+            if abs(score) >= MATE - depth:
+                break
+
+        result.nodes = self.nodes
+        result.elapsed = time.time() - start
+        return result
+
+    def cancel(self):
+        """Make a search running in another thread stop as soon as it
+        can. It returns the result of the last depth it finished, or the
+        best move so far during depth one, if any root move was searched.
+        Every later search stops at once.
+
+        """
+        self.cancelled = True
+
+    def out_of_time(self):
+        if self.cancelled:
+            self.stopped = True
+            return True
+        if not self.limits:
+            return False
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            self.stopped = True
+        elif self.deadline is not None and self.nodes % 256 == 0:
+            self.stopped = time.time() >= self.deadline
+        return self.stopped
+
+    def terminal_score(self, board, ply):
+        if board.check():
+            return -MATE + ply
+        return 0
+
+    def root(self, board, moves, depth, pv):
+        alpha, beta = -MATE - 1, MATE + 1
+        for move in moves:
+            child_pv = []
+            board.make_move(move)
+            score = -self.negamax(board, depth - 1, -beta, -alpha, 1,
+                                  child_pv)
+            board.unmake_move()
+            if self.stopped:
+                return alpha
+            if score > alpha:
+                alpha = score
+                pv[:] = [move] + child_pv
+            # There is a move to play now, so the limits may stop the
+            # search.
+            self.limits = True
+        return alpha
+
+    def order_moves(self, board, moves, ply=0, hash_move=None):
+        """Return `moves` sorted best first by the heuristics in
+        `ordering`: the hash move, then captures and promotions, killer
+        moves and the other quiet moves.
+
+        """
+        ordering = self.ordering
+        if 'killers' in ordering and ply < len(self.killers):
+            killers = self.killers[ply]
+        else:
+            killers = ()
+        history = self.history if 'history' in ordering else {}
+        mvv_lva = 'mvv_lva' in ordering
+        if 'hash' not in ordering:
+            hash_move = None
+
+        def key(move):
+            (old_x, old_y), (new_x, new_y), promotion = move
+            if move == hash_move:
+                return 4, 0
+            victim = board.board[new_y][new_x]
+            if victim is not board.EMPTY or promotion is not None:
+                if not mvv_lva:
+                    return 3, 0
+                attacker = board.board[old_y][old_x]
+                value = -PIECE_VALUES[type(attacker)]
+                if victim is not board.EMPTY:
+                    value += 10 * PIECE_VALUES[type(victim)]
+                if promotion is not None:
+                    value += 10 * PIECE_VALUES[promotion]
+                return 3, value
+            if move in killers:
+                return 2, -killers.index(move)
+            return 1, history.get(move, 0)
+
+        return sorted(moves, key=key, reverse=True)
+
+    def store_cutoff(self, board, move, depth, ply):
+        """Remember a quiet `move` which caused a beta cutoff."""
+        new_x, new_y = move[1]
+        if board.board[new_y][new_x] is not board.EMPTY or move[2]:
+            return
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def store_hash_move(self, board, move):
+        if len(self.hash_moves) >= self.table_size:
+            self.hash_moves.clear()
+        self.hash_moves[board.position_hash] = move
+
+    def null_move_allowed(self, board, depth, beta):
+        """Return whether passing the move is a safe test of the position:
+        deep enough, not in check, not near mate and with a piece other
+        than pawns and the king to move, as zugzwang is rare then.
+
+        """
+        if depth <= NULL_MOVE_REDUCTION or abs(beta) >= MATE - 1000:
+            return False
+        if board.check():
+            return False
+        for row in board.board:
+            for piece in row:
+                if (piece is not board.EMPTY and piece.color == board.turn
+                        and type(piece) is not chess.Pawn and
+                        type(piece) is not chess.King):
+                    return True
+        return False
+
+    def negamax(self, board, depth, alpha, beta, ply, pv, null_move=True):
+        if depth <= 0 and self.use_quiescence:
+            return self.quiescence(board, alpha, beta, ply)
+        self.nodes += 1
+        if self.out_of_time():
+            return 0
+
+        if depth <= 0:
+            return evaluate(board)
+        moves = board.legal_moves()
+        if not moves:
+            return self.terminal_score(board, ply)
+
+        selectivity = self.selectivity
+        if (null_move and 'null_move' in selectivity and
+                self.null_move_allowed(board, depth, beta)):
+            board.make_null_move()
+            score = -self.negamax(board, depth - 1 - NULL_MOVE_REDUCTION,
+                                  -beta, -beta + 1, ply + 1, [], False)
+            board.unmake_null_move()
+            if self.stopped:
+                return 0
+            if score >= beta:
+                self.null_move_cutoffs += 1
+                return beta
+
+        reduce = 'reductions' in selectivity and depth >= 3
+        if reduce:
+            reduce = not board.check()
+        extend = 'check_extensions' in selectivity and ply < self.max_ply
+        hash_move = self.hash_moves.get(board.position_hash)
+        moves = self.order_moves(board, moves, ply, hash_move)
+        best_move = None
+        for index, move in enumerate(moves):
+            child_pv = []
+            quiet = not is_capture(board, move)
+            board.make_move(move)
+            new_depth = depth - 1
+            gives_check = (extend or reduce) and board.check()
+            if extend and gives_check:
+                self.extensions += 1
+                new_depth += 1
+            if (reduce and quiet and index >= REDUCED_MOVES and
+                    not gives_check):
+                self.reductions += 1
+                score = -self.negamax(board, new_depth - 1, -alpha - 1,
+                                      -alpha, ply + 1, child_pv)
+                if score > alpha and not self.stopped:
+                    self.re_searches += 1
+                    child_pv = []
+                    score = -self.negamax(board, new_depth, -beta, -alpha,
+                                          ply + 1, child_pv)
+            else:
+                score = -self.negamax(board, new_depth, -beta, -alpha,
+                                      ply + 1, child_pv)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score >= beta:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                self.store_cutoff(board, move, depth, ply)
+                self.store_hash_move(board, move)
+                return score
+            if score > alpha:
+                alpha = score
+                best_move = move
+                pv[:] = [move] + child_pv
+        if best_move is not None:
+            self.store_hash_move(board, best_move)
+        return alpha
+
+    def quiescence(self, board, alpha, beta, ply):
+        """Score `board` once the side to move has no more captures or
+        promotions worth playing.
+
+        The side to move may stand pat on the static evaluation, unless in
+        check, when every move is searched. Otherwise only the captures
+        and promotions which do not lose material by `see` are.
+
+        """
+        self.nodes += 1
+        self.quiescence_nodes += 1
+        if self.out_of_time():
+            return 0
+
+        moves = board.legal_moves()
+        if not moves:
+            return self.terminal_score(board, ply)
+        in_check = board.check()
+        if not in_check:
+            score = evaluate(board)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+            moves = [move for move in moves if is_capture(board, move) and
+                     see(board, move) >= 0]
+
+        for move in self.order_moves(board, moves, ply):
+            board.make_move(move)
+            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def root_move_task(task):
+    fen, move, board_class, max_depth, deadline, node_limit = task
+    board = board_class.from_fen(fen)
+    board.make_move(move)
+    time_limit = None
+    if deadline is not None:
+        time_limit = deadline - time.time()
+        if time_limit <= 0:
+            return -evaluate(board), [], 1, 0
+    searcher = Engine(max_depth, time_limit, node_limit)
+    if max_depth < 1:
+        score = -searcher.quiescence(board, -MATE - 1, MATE + 1, 1)
+        return score, [], searcher.nodes + 1, 0
+    result = searcher.search(board)
+    score = -result.score
+    depth = result.depth
+    if score > MATE - 1000:
+        score -= 1
+        depth = max_depth
+    elif score < 1000 - MATE:
+        score += 1
+        depth = max_depth
+    elif result.best_move is None:
+        depth = max_depth
+    return score, result.pv, result.nodes + 1, depth
+
+
+def parallel_search(board, max_depth=6, time_limit=None, node_limit=None,
+                    workers=None, executor=None):
+    """Search `board` with its root moves split over worker processes.
+
+    Every root move is searched to `max_depth` - 1 plies in its own task
+    by a worker which gets the position as a FEN string. The limits hold
+    for the whole search: every task stops at the same deadline, a task
+    which starts after it only scores its position, and the node budget
+    is shared out between the tasks. The best score wins and ties go to
+    the move generated first, so the result does not depend on which
+    worker finishes first. The depth reported is the smallest any task
+    completed. Pass `executor` to reuse a `ProcessPoolExecutor`.
+
+    """
+    start = time.time()
+    moves = board.legal_moves()
+    if not moves:
+        return SearchResult(None, Engine().terminal_score(board, 0), [], 0,
+                            0, 0.0)
+
+    fen = board.to_fen()
+    deadline = None if time_limit is None else start + time_limit
+    if node_limit is not None:
+        node_limit = max(node_limit // len(moves), 1)
+    tasks = [(fen, move, type(board), max_depth - 1, deadline, node_limit)
+             for move in moves]
+    if executor is not None:
+        results = list(executor.map(root_move_task, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(root_move_task, tasks))
+
+    best = 0
+    for i, (score, pv, nodes, depth) in enumerate(results):
+        if score > results[best][0]:
+            best = i
+    score, pv, nodes, depth = results[best]
+    return SearchResult(moves[best], score, [moves[best]] + pv,
+                        1 + min(result[3] for result in results),
+                        sum(result[2] for result in results),
+                        time.time() - start)
+
+
+def bench(fen, depth, ordering=ORDERINGS, quiescence=True,
+          selectivity=SELECTIVITY):
+    """Search `fen` to `depth` and return the result and the statistics
+    of the search.
+
+    """
+    board = chess.ChessBoard.from_fen(fen)
+    searcher = Engine(depth, ordering=ordering, quiescence=quiescence,
+                      selectivity=selectivity)
+    result = searcher.search(board)
+    return result, searcher.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compare move ordering heuristics and selective search '
+                    'on the perft positions.')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-p', '--position', action='append',
+                        help='name of a perft position or a FEN string; '
+                             'may be repeated (default: all positions)')
+    parser.add_argument('-o', '--ordering', default=','.join(ORDERINGS),
+                        help="comma separated heuristics from %s, or 'none' "
+                             '(default: all)' % ', '.join(ORDERINGS))
+    parser.add_argument('-s', '--selectivity', default=','.join(SELECTIVITY),
+                        help="comma separated techniques from %s, or 'none' "
+                             '(default: all)' % ', '.join(SELECTIVITY))
+    parser.add_argument('--no-quiescence', dest='quiescence',
+                        action='store_false',
+                        help='score the positions at the horizon as they '
+                             'stand')
+    args = parser.parse_args(argv)
+
+    def names(value, choices, kind):
+        if value == 'none':
+            return ()
+        chosen = value.split(',')
+        for name in chosen:
+            if name not in choices:
+                parser.error('unknown %s: %s' % (kind, name))
+        return chosen
+
+    ordering = names(args.ordering, ORDERINGS, 'ordering heuristic')
+    selectivity = names(args.selectivity, SELECTIVITY, 'selective search')
+    positions = dict((name, fen) for name, fen, expected in perft.POSITIONS)
+    if args.position:
+        selected = [(name, positions.get(name, name))
+                    for name in args.position]
+    else:
+        selected = [(name, fen) for name, fen, expected in perft.POSITIONS]
+
+    for name, fen in selected:
+        result, stats = bench(fen, args.depth, ordering, args.quiescence,
+                              selectivity)
+        sys.stdout.write('%-10s depth %d: %9d nodes (%d quiescence) %7.2fs '
+                         '%8.0f nps  first move cutoffs %5.1f%%  best %s\n' %
+                         (name[:10], result.depth, stats['nodes'],
+                          stats['quiescence_nodes'], result.elapsed,
+                          stats['nodes'] / max(result.elapsed, 1e-9),
+                          100 * stats['first_move_cutoff_rate'],
+                          perft.move_name(result.best_move)
+                          if result.best_move else '-'))
+        sys.stdout.write('%-10s null move cutoffs %d, reductions %d '
+                         '(%d searched again), check extensions %d\n' %
+                         ('', stats['null_move_cutoffs'], stats['reductions'],
+                          stats['re_searches'], stats['extensions']))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import unittest
+import chess
+import engine
+import perft
+
+
+class EngineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = engine.Engine(max_depth=3)
+
+    def test_evaluate(self):
+        board = chess.ChessBoard()
+        self.assertEqual(0, engine.evaluate(board))
+        board.set_piece((3, 0), None)
+        score = engine.evaluate(board)
+        self.assertGreater(score, 800)
+        board.switch_turn()
+        self.assertEqual(-score, engine.evaluate(board))
+
+    def test_search(self):
+        board = chess.ChessBoard()
+        position_hash = board.position_hash
+        result = self.engine.search(board)
+        self.assertIn(result.best_move, board.legal_moves())
+        self.assertEqual(3, result.depth)
+        self.assertEqual(3, len(result.pv))
+        self.assertEqual(result.best_move, result.pv[0])
+        self.assertEqual(position_hash, board.position_hash)
+        self.assertEqual([], board.undo_stack)
+
+    def test_principal_variation(self):
+        board = chess.ChessBoard()
+        result = self.engine.search(board)
+        for move in result.pv:
+            self.assertIn(move, board.legal_moves())
+            board.make_move(move)
+
+    def test_mate_in_one(self):
+        board = chess.ChessBoard.from_fen('r1bqkbnr/pppp1ppp/2n5/4p3/'
+                                          '2B1P3/5Q2/PPPP1PPP/RNB1K1NR '
+                                          'w KQkq - 0 1')
+        result = self.engine.search(board)
+        self.assertEqual(((5, 5), (5, 1), None), result.best_move)
+        self.assertEqual(engine.MATE - 1, result.score)
+
+    def test_wins_material(self):
+        board = chess.ChessBoard.from_fen('4k3/8/8/3q4/8/8/8/3QK3 w - - 0 1')
+        result = self.engine.search(board, max_depth=2)
+        self.assertEqual(((3, 7), (3, 3), None), result.best_move)
+
+    def test_no_moves(self):
+        board = chess.ChessBoard.from_fen('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1')
+        result = self.engine.search(board)
+        self.assertIsNone(result.best_move)
+        self.assertEqual(0, result.score)
+
+    def test_node_limit(self):
+        board = chess.ChessBoard()
+        result = self.engine.search(board, max_depth=10, node_limit=500)
+        self.assertLess(result.depth, 10)
+        self.assertIsNotNone(result.best_move)
+        self.assertEqual([], board.undo_stack)
+
+    def test_time_limit(self):
+        board = chess.ChessBoard()
+        result = self.engine.search(board, max_depth=20, time_limit=0.2)
+        self.assertLess(result.elapsed, 1.0)
+        self.assertIsNotNone(result.best_move)
+
+    def test_time_limit_depth_one(self):
+        name, fen, expected = perft.POSITIONS[3]
+        board = chess.ChessBoard.from_fen(fen)
+        result = engine.Engine(20, time_limit=0.3).search(board)
+        self.assertLess(result.elapsed, 0.6)
+        self.assertIn(result.best_move, board.legal_moves())
+        self.assertEqual(result.best_move, result.pv[0])
+
+    def test_cancel(self):
+        board = chess.ChessBoard()
+        self.engine.cancel()
+        result = self.engine.search(board, max_depth=10)
+        self.assertIsNone(result.best_move)
+        self.assertEqual(0, result.depth)
+        self.assertEqual([], board.undo_stack)
+
+    def test_order_moves(self):
+        board = chess.ChessBoard.from_fen('4k3/8/8/3q4/4P3/8/8/3QK3 '
+                                          'w - - 0 1')
+        moves = self.engine.order_moves(board, board.legal_moves())
+        self.assertEqual(((4, 4), (3, 3), None), moves[0])
+        self.assertEqual(((3, 7), (3, 3), None), moves[1])
+        hash_move = ((4, 7), (5, 7), None)
+        moves = self.engine.order_moves(board, board.legal_moves(), 0,
+                                        hash_move)
+        self.assertEqual(hash_move, moves[0])
+
+    def test_killers_and_history(self):
+        board = chess.ChessBoard()
+        self.engine.killers = [[None, None]]
+        self.engine.store_cutoff(board, ((6, 7), (5, 5), None), 2, 0)
+        self.engine.store_cutoff(board, ((1, 7), (2, 5), None), 3, 0)
+        self.assertEqual([((1, 7), (2, 5), None), ((6, 7), (5, 5), None)],
+                         self.engine.killers[0])
+        self.assertEqual(9, self.engine.history[(1, 7), (2, 5), None])
+        moves = self.engine.order_moves(board, board.legal_moves(), 0)
+        self.assertEqual(((1, 7), (2, 5), None), moves[0])
+        self.assertEqual(((6, 7), (5, 5), None), moves[1])
+
+    def test_cutoff_stats(self):
+        board = chess.ChessBoard()
+        self.engine.search(board)
+        stats = self.engine.stats()
+        self.assertGreater(stats['cutoffs'], 0)
+        self.assertLessEqual(stats['first_move_cutoffs'], stats['cutoffs'])
+        self.assertGreater(stats['first_move_cutoff_rate'], 0.5)
+        unordered = engine.Engine(3, ordering=())
+        result = unordered.search(board)
+        self.assertEqual(3, result.depth)
+        self.assertGreater(unordered.stats()['nodes'], stats['nodes'])
+
+    def test_see(self):
+        board = chess.ChessBoard.from_fen('4k3/8/4p3/3p4/8/8/3R4/3QK3 '
+                                          'w - - 0 1')
+        self.assertEqual(100 - 500 + 100,
+                         engine.see(board, ((3, 6), (3, 3), None)))
+        self.assertEqual(100 - 900 + 100,
+                         engine.see(board, ((3, 7), (3, 3), None)))
+        board = chess.ChessBoard.from_fen('4k3/8/8/3p4/4P3/8/3R4/3QK3 '
+                                          'w - - 0 1')
+        self.assertEqual(100, engine.see(board, ((4, 4), (3, 3), None)))
+        board = chess.ChessBoard.from_fen('3rk3/8/8/3p4/8/8/3R4/3QK3 '
+                                          'w - - 0 1')
+        self.assertEqual(100, engine.see(board, ((3, 6), (3, 3), None)))
+        board = chess.ChessBoard.from_fen('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1')
+        self.assertEqual(800, engine.see(board, ((1, 1), (1, 0),
+                                                 chess.Queen)))
+
+    def test_quiescence(self):
+        board = chess.ChessBoard.from_fen('4k3/8/4p3/3p4/8/8/8/3QK3 '
+                                          'w - - 0 1')
+        blunder = ((3, 7), (3, 3), None)
+        horizon = engine.Engine(1, quiescence=False)
+        self.assertEqual(blunder, horizon.search(board).best_move)
+        self.assertEqual(0, horizon.stats()['quiescence_nodes'])
+        searcher = engine.Engine(1)
+        result = searcher.search(board)
+        self.assertNotEqual(blunder, result.best_move)
+        self.assertGreater(searcher.stats()['quiescence_nodes'], 0)
+        self.assertEqual([], board.undo_stack)
+
+    def test_selectivity(self):
+        board = chess.ChessBoard()
+        selective = engine.Engine(4)
+        result = selective.search(board)
+        self.assertEqual(4, result.depth)
+        stats = selective.stats()
+        self.assertGreater(stats['null_move_cutoffs'], 0)
+        self.assertGreater(stats['reductions'], 0)
+        self.assertLessEqual(stats['re_searches'], stats['reductions'])
+        full = engine.Engine(4, selectivity=())
+        full.search(board)
+        self.assertGreater(full.stats()['nodes'], stats['nodes'])
+        self.assertEqual(0, full.stats()['null_move_cutoffs'])
+        self.assertEqual(0, full.stats()['reductions'])
+        self.assertEqual([], board.undo_stack)
+
+    def test_null_move_allowed(self):
+        board = chess.ChessBoard()
+        self.assertTrue(self.engine.null_move_allowed(board, 3, 0))
+        self.assertFalse(self.engine.null_move_allowed(board, 2, 0))
+        self.assertFalse(self.engine.null_move_allowed(board, 3,
+                                                       engine.MATE - 1))
+        board = chess.ChessBoard.from_fen('4k3/4p3/8/8/8/8/4P3/4K3 '
+                                          'w - - 0 1')
+        self.assertFalse(self.engine.null_move_allowed(board, 3, 0))
+        board = chess.ChessBoard.from_fen('4k3/8/8/8/8/8/4r3/R3K3 '
+                                          'w - - 0 1')
+        self.assertFalse(self.engine.null_move_allowed(board, 3, 0))
+
+    def test_check_extensions(self):
+        board = chess.ChessBoard.from_fen(perft.POSITIONS[2][1])
+        extended = engine.Engine(2, selectivity=['check_extensions'])
+        extended.search(board)
+        self.assertGreater(extended.stats()['extensions'], 0)
+        plain = engine.Engine(2, selectivity=())
+        plain.search(board)
+        self.assertEqual(0, plain.stats()['extensions'])
+
+    def test_parallel_search(self):
+        board = chess.ChessBoard.from_fen('r1bqkbnr/pppp1ppp/2n5/4p3/'
+                                          '2B1P3/5Q2/PPPP1PPP/RNB1K1NR '
+                                          'w KQkq - 0 1')
+        result = engine.parallel_search(board, 2, workers=2)
+        self.assertEqual(((5, 5), (5, 1), None), result.best_move)
+        self.assertEqual(engine.MATE - 1, result.score)
+        self.assertEqual(2, result.depth)
+        self.assertEqual([], board.undo_stack)
+
+    def test_parallel_search_limits(self):
+        board = chess.ChessBoard()
+        result = engine.parallel_search(board, 8, time_limit=0.3, workers=2)
+        self.assertIn(result.best_move, board.legal_moves())
+        self.assertLess(result.elapsed, 1.5)
+        self.assertGreaterEqual(result.depth, 1)
+        self.assertLess(result.depth, 8)
+
+if __name__ == '__main__':
+    unittest.main()
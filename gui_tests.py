@@ -0,0 +1,45 @@
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import chess
+import GUI
+
+
+class GUITests(unittest.TestCase):
+
+    def setUp(self):
+        pygame.font.init()
+        GUI.FONT = pygame.font.Font('freesansbold.ttf', 16)
+
+    def pixel(self, box):
+        left, top = GUI.left_top_coords_of_box(box)
+        return left + 5, top + 5
+
+    def test_promotion_against_computer(self):
+        game = chess.ChessBoard.from_fen('4k3/P7/8/8/8/8/8/4K3 w - - 0 1')
+        player = GUI.EnginePlayer(GUI.BLACK)
+        self.assertTrue(GUI.human_turn(game, player, None))
+        selection, buttons = GUI.click(game, self.pixel((0, 1)), None, None)
+        self.assertEqual((0, 1), selection)
+        selection, buttons = GUI.click(game, self.pixel((0, 0)), selection,
+                                       buttons)
+        self.assertIsNone(selection)
+        self.assertTrue(buttons)
+        self.assertEqual(GUI.BLACK, game.turn)
+        self.assertTrue(GUI.human_turn(game, player, buttons))
+
+        queen = [rect for surface, rect, piece in buttons
+                 if piece is chess.Queen][0]
+        self.assertIsNone(GUI.click(game, (0, 0), selection, buttons))
+        selection, buttons = GUI.click(game, queen.center, selection,
+                                       buttons)
+        self.assertIsNone(buttons)
+        self.assertIs(chess.Queen(GUI.WHITE), game.board[0][0])
+        self.assertFalse(game.promotion_allowed())
+        self.assertFalse(GUI.human_turn(game, player, buttons))
+
+if __name__ == '__main__':
+    unittest.main()
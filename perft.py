@@ -0,0 +1,173 @@
+"""Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+Run `python perft.py --help` for the command line options. The reference
+counts are the published ones for the standard perft test positions.
+
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import chess
+
+POSITIONS = (
+    ('start',
+     'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     (20, 400, 8902, 197281, 4865609)),
+    ('kiwipete',
+     'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     (48, 2039, 97862, 4085603)),
+    ('position3',
+     '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     (14, 191, 2812, 43238, 674624)),
+    ('position4',
+     'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     (6, 264, 9467, 422333)),
+    ('position5',
+     'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     (44, 1486, 62379, 2103487)),
+    ('position6',
+     'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 '
+     'w - - 0 10',
+     (46, 2079, 89890, 3894594)),
+)
+
+
+def move_name(move):
+    """Return `move` in coordinate notation, e.g. `e2e4` or `a7a8q`."""
+    (old_x, old_y), (new_x, new_y), promotion = move
+    name = '%s%d%s%d' % ('abcdefgh'[old_x], 8 - old_y,
+                         'abcdefgh'[new_x], 8 - new_y)
+    if promotion is not None:
+        name += promotion.letter
+    return name
+
+
+def perft(board, depth):
+    """Count the leaf nodes `depth` plies below the position on `board`."""
+    moves = board.legal_moves()
+    if depth == 1:
+        return len(moves)
+    if depth == 0:
+        return 1
+
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth):
+    """Return `(move, nodes)` pairs with the perft count below each root
+    move, in the order the moves are generated.
+
+    """
+    counts = []
+    for move in board.legal_moves():
+        board.make_move(move)
+        counts.append((move, perft(board, depth - 1)))
+        board.unmake_move()
+    return counts
+
+
+def perft_task(task):
+    fen, move, depth, board_class = task
+    board = board_class.from_fen(fen)
+    board.make_move(move)
+    return perft(board, depth - 1)
+
+
+def parallel_divide(board, depth, workers=None, executor=None):
+    """Like `divide`, with the root moves spread over worker processes.
+
+    Workers get the position as a FEN string and the counts come back in
+    the order the moves are generated. Pass `executor` to reuse a
+    `ProcessPoolExecutor`, otherwise one with `workers` processes is made.
+
+    """
+    fen = board.to_fen()
+    moves = board.legal_moves()
+    if depth < 2:
+        return [(move, 1) for move in moves]
+    tasks = [(fen, move, depth, type(board)) for move in moves]
+    if executor is not None:
+        counts = list(executor.map(perft_task, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            counts = list(pool.map(perft_task, tasks))
+    return list(zip(moves, counts))
+
+
+def parallel_perft(board, depth, workers=None, executor=None):
+    if depth < 2:
+        return perft(board, depth)
+    counts = parallel_divide(board, depth, workers, executor)
+    return sum(count for move, count in counts)
+
+
+def run(name, fen, expected, depth, board_class, show_divide, out,
+        workers=1):
+    board = board_class.from_fen(fen)
+    start = time.time()
+    if show_divide:
+        if workers > 1:
+            counts = parallel_divide(board, depth, workers)
+        else:
+            counts = divide(board, depth)
+        for move, count in counts:
+            out.write('  %s: %d\n' % (move_name(move), count))
+        nodes = sum(count for move, count in counts)
+    elif workers > 1:
+        nodes = parallel_perft(board, depth, workers)
+    else:
+        nodes = perft(board, depth)
+    elapsed = time.time() - start
+
+    if depth <= len(expected):
+        result = 'ok' if nodes == expected[depth - 1] else \
+            'FAIL (expected %d)' % expected[depth - 1]
+    else:
+        result = 'no reference'
+    out.write('%-10s depth %d: %10d nodes %8.2fs %9.0f nps  %s\n' %
+              (name, depth, nodes, elapsed, nodes / max(elapsed, 1e-9),
+               result))
+    return result != 'ok' and result != 'no reference'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run perft benchmarks.')
+    parser.add_argument('-d', '--depth', type=int, default=3)
+    parser.add_argument('-p', '--position', action='append',
+                        help='name of a standard position or a FEN string; '
+                             'may be repeated (default: all positions)')
+    parser.add_argument('--divide', action='store_true',
+                        help='print the node count below every root move')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='split the root moves over this many processes')
+    args = parser.parse_args(argv)
+    if args.depth < 1:
+        parser.error('the depth must be at least 1')
+
+    positions = dict((name, (fen, expected))
+                     for name, fen, expected in POSITIONS)
+    if args.position:
+        selected = []
+        for position in args.position:
+            if position in positions:
+                selected.append((position,) + positions[position])
+            else:
+                selected.append(('fen', position, ()))
+    else:
+        selected = POSITIONS
+
+    failed = False
+    for name, fen, expected in selected:
+        failed |= run(name, fen, expected, args.depth,
+                      chess.ChessBoard, args.divide, sys.stdout,
+                      args.workers)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import unittest
+import chess
+import perft
+
+
+class PerftTests(unittest.TestCase):
+
+    def test_start_position(self):
+        board = chess.ChessBoard()
+        self.assertEqual(20, perft.perft(board, 1))
+        self.assertEqual(400, perft.perft(board, 2))
+        self.assertEqual(8902, perft.perft(board, 3))
+
+    def test_standard_positions(self):
+        for name, fen, expected in perft.POSITIONS:
+            board = chess.ChessBoard.from_fen(fen)
+            self.assertEqual(expected[1], perft.perft(board, 2), name)
+
+    def test_divide(self):
+        name, fen, expected = perft.POSITIONS[2]
+        board = chess.ChessBoard.from_fen(fen)
+        counts = perft.divide(board, 3)
+        self.assertEqual(expected[0], len(counts))
+        self.assertEqual(expected[2], sum(count for move, count in counts))
+
+    def test_fen_round_trip(self):
+        for name, fen, expected in perft.POSITIONS:
+            board = chess.ChessBoard.from_fen(fen)
+            self.assertEqual(fen, board.to_fen(), name)
+
+    def test_parallel_divide(self):
+        name, fen, expected = perft.POSITIONS[1]
+        board = chess.ChessBoard.from_fen(fen)
+        result = perft.parallel_divide(board, 2, workers=2)
+        self.assertEqual(perft.divide(board, 2), result)
+        result = perft.parallel_perft(board, 2, workers=2)
+        self.assertEqual(expected[1], result)
+
+    def test_main_depth(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                perft.main(['-d', '0', '--divide'])
+
+    def test_move_name(self):
+        result = perft.move_name(((4, 6), (4, 4), None))
+        self.assertEqual('e2e4', result)
+        result = perft.move_name(((0, 1), (0, 0), chess.Queen))
+        self.assertEqual('a7a8q', result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""Streaming reader and replayer for PGN game archives.
+
+`read_games` parses PGN text a line at a time and yields every game as
+soon as its move text ends, so archives of any size are read at constant
+memory. `replay_games` also plays every game on a `ChessBoard` and yields
+a `GameResult` for it.
+
+"""
+import re
+import chess
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+PIECES = {'N': chess.Knight, 'B': chess.Bishop, 'R': chess.Rook,
+          'Q': chess.Queen, 'K': chess.King}
+
+TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN = re.compile(r'[{}();]|[^\s{}();]+')
+MOVE_NUMBER = re.compile(r'^\d+\.*')
+SAN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+
+
+class Game:
+    """A game read from PGN.
+
+    `headers` maps tag names to values, `moves` lists the moves of the
+    main line in SAN and `result` is the game termination marker.
+
+    """
+
+    def __init__(self, headers, moves, result):
+        self.headers = headers
+        self.moves = moves
+        self.result = result
+
+    def __repr__(self):
+        return 'Game(%d moves, result=%r)' % (len(self.moves), self.result)
+
+
+class GameResult:
+    """Outcome of replaying a `Game`.
+
+    `status` is the `game_status` of the board after the last legal move
+    and `plies` the number of moves played. `illegal_move` is the first
+    move which is not legal in its position, `None` if all of them are,
+    and `error` describes why the game could not be replayed.
+
+    """
+
+    def __init__(self, game, status, plies, illegal_move=None, error=None):
+        self.game = game
+        self.status = status
+        self.plies = plies
+        self.illegal_move = illegal_move
+        self.error = error
+
+    def __repr__(self):
+        return ('GameResult(status=%r, plies=%d, illegal_move=%r)' %
+                (self.status, self.plies, self.illegal_move))
+
+
+def read_games(lines):
+    """Yield a `Game` for every game in `lines`, an iterable of PGN lines
+    such as an open file.
+
+    Comments, variations and numeric annotation glyphs are skipped. A game
+    ends at its termination marker, or at the tag section of the next game
+    or the end of `lines` if the marker is missing.
+
+    """
+    headers = {}
+    moves = []
+    comment = False
+    variation = 0
+
+    for line in lines:
+        if not comment and not variation:
+            stripped = line.strip()
+            if stripped.startswith('%'):
+                continue
+            if stripped.startswith('['):
+                if moves:
+                    yield Game(headers, moves, headers.get('Result', '*'))
+                    headers = {}
+                    moves = []
+                for name, value in TAG.findall(stripped):
+                    headers[name] = value.replace('\\"', '"')
+                continue
+
+        for token in TOKEN.findall(line):
+            if comment:
+                if token == '}':
+                    comment = False
+            elif token == '{':
+                comment = True
+            elif token == ';':
+                break
+            elif token == '(':
+                variation += 1
+            elif token == ')':
+                variation = max(variation - 1, 0)
+            elif variation or token.startswith('$'):
+                continue
+            elif token in RESULTS:
+                yield Game(headers, moves, token)
+                headers = {}
+                moves = []
+            else:
+                token = MOVE_NUMBER.sub('', token)
+                if token:
+                    moves.append(token)
+
+    if moves or headers:
+        yield Game(headers, moves, headers.get('Result', '*'))
+
+
+def parse_san(board, san):
+    """Return the legal move of `board` written as `san` in standard
+    algebraic notation, or `None` if there is no such move or it is
+    ambiguous.
+
+    """
+    san = san.rstrip('+#!?')
+    if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        if board.turn == board.WHITE:
+            x, y = board.white_king
+        else:
+            x, y = board.black_king
+        if len(san) == 3:
+            move = (x, y), (x + 2, y), None
+        else:
+            move = (x, y), (x - 2, y), None
+        if move in board.legal_moves():
+            return move
+        return None
+
+    match = SAN.match(san)
+    if match is None:
+        return None
+    letter, old_file, old_rank, square, promotion = match.groups()
+    piece = PIECES.get(letter, chess.Pawn)
+    new_pos = ord(square[0]) - ord('a'), 8 - int(square[1])
+    if promotion is not None:
+        promotion = PIECES[promotion]
+
+    found = None
+    for move in board.legal_moves():
+        (old_x, old_y), pos, move_promotion = move
+        if pos != new_pos or move_promotion is not promotion:
+            continue
+        if type(board.board[old_y][old_x]) is not piece:
+            continue
+        if old_file is not None and old_x != ord(old_file) - ord('a'):
+            continue
+        if old_rank is not None and old_y != 8 - int(old_rank):
+            continue
+        if found is not None:
+            return None
+        found = move
+    return found
+
+
+def replay(game, board_class=chess.ChessBoard, cache=None):
+    """Play `game` on a new `board_class` board and return a `GameResult`.
+
+    Games with a `FEN` tag start from that position. Replaying stops at
+    the first illegal move. A game which cannot be replayed, like one
+    with an invalid `FEN` tag, gets a result with the `None` status and
+    the reason as `error`.
+
+    """
+    plies = 0
+    illegal_move = None
+    try:
+        if 'FEN' in game.headers:
+            board = board_class.from_fen(game.headers['FEN'], cache)
+        else:
+            board = board_class(cache)
+        for san in game.moves:
+            move = parse_san(board, san)
+            if move is None:
+                illegal_move = san
+                break
+            board.make_move(move)
+            plies += 1
+        board.update_game_status()
+    except ValueError as error:
+        return GameResult(game, None, plies, error=str(error))
+    except Exception as error:
+        # A bad game must not take down the process replaying an archive.
+        return GameResult(game, None, plies,
+                          error='%s at ply %d: %s' %
+                          (type(error).__name__, plies + 1, error))
+
+    if illegal_move is None:
+        return GameResult(game, board.game_status, plies)
+    return GameResult(game, board.game_status, plies, illegal_move,
+                      'illegal move %s at ply %d' % (illegal_move, plies + 1))
+
+
+def replay_games(lines, board_class=chess.ChessBoard, cache=None):
+    """Yield a `GameResult` for every game in the PGN `lines`."""
+    for game in read_games(lines):
+        yield replay(game, board_class, cache)
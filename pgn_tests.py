@@ -0,0 +1,89 @@
+import unittest
+import chess
+import pgn
+
+GAMES = '''[Event "Scholar's mate"]
+[White "A"]
+[Black "B"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 {attacking f7} Nc6 (2... Nf6 3. d3) 3. Qh5 Nf6?? $4
+4. Qxf7# 1-0
+
+[Event "Illegal"]
+[Result "*"]
+
+1. e4 e5 2. Ke3 *
+
+[Event "From a position"]
+[FEN "4k3/P7/8/8/8/8/8/4K3 w - - 0 1"]
+[SetUp "1"]
+
+1. a8=Q+ Kd7 ; a line comment
+1/2-1/2
+'''
+
+
+class BrokenBoard(chess.ChessBoard):
+
+    def make_move(self, move):
+        if self.fullmove_number > 1:
+            raise IndexError('broken board')
+        chess.ChessBoard.make_move(self, move)
+
+
+class PGNTests(unittest.TestCase):
+
+    def test_read_games(self):
+        games = list(pgn.read_games(GAMES.splitlines(True)))
+        self.assertEqual(3, len(games))
+        self.assertEqual("Scholar's mate", games[0].headers['Event'])
+        self.assertEqual(['e4', 'e5', 'Bc4', 'Nc6', 'Qh5', 'Nf6??',
+                          'Qxf7#'], games[0].moves)
+        self.assertEqual('1-0', games[0].result)
+        self.assertEqual(['a8=Q+', 'Kd7'], games[2].moves)
+        self.assertEqual('1/2-1/2', games[2].result)
+
+    def test_parse_san(self):
+        board = chess.ChessBoard.from_fen('r3k2r/8/8/8/8/2N3N1/8/R3K2R '
+                                          'w KQkq - 0 1')
+        self.assertEqual(((4, 7), (6, 7), None), pgn.parse_san(board, 'O-O'))
+        self.assertEqual(((4, 7), (2, 7), None),
+                         pgn.parse_san(board, 'O-O-O'))
+        self.assertIsNone(pgn.parse_san(board, 'Ne4'))
+        self.assertEqual(((2, 5), (4, 4), None),
+                         pgn.parse_san(board, 'Nce4'))
+        self.assertEqual(((0, 7), (0, 0), None),
+                         pgn.parse_san(board, 'Rxa8+'))
+        self.assertIsNone(pgn.parse_san(board, 'e4'))
+        board = chess.ChessBoard.from_fen('1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1')
+        self.assertEqual(((0, 1), (1, 0), chess.Knight),
+                         pgn.parse_san(board, 'axb8=N'))
+        self.assertIsNone(pgn.parse_san(board, 'axb8'))
+
+    def test_replay_games(self):
+        results = list(pgn.replay_games(GAMES.splitlines(True)))
+        self.assertEqual(chess.ChessBoard.WHITE_WIN, results[0].status)
+        self.assertEqual(7, results[0].plies)
+        self.assertIsNone(results[0].illegal_move)
+        self.assertEqual('Ke3', results[1].illegal_move)
+        self.assertEqual(2, results[1].plies)
+        self.assertEqual(chess.ChessBoard.GAME_IN_PROGRESS, results[1].status)
+        self.assertEqual(2, results[2].plies)
+        self.assertIsNone(results[2].error)
+
+    def test_invalid_fen(self):
+        game = pgn.Game({'FEN': '8/8/8 w - - 0 1'}, ['e4'], '*')
+        result = pgn.replay(game)
+        self.assertIsNone(result.status)
+        self.assertIsNotNone(result.error)
+
+    def test_replay_error(self):
+        game = pgn.Game({}, ['e4', 'e5', 'Nf3', 'Nc6'], '*')
+        result = pgn.replay(game, BrokenBoard)
+        self.assertIsNone(result.status)
+        self.assertEqual(2, result.plies)
+        self.assertEqual('IndexError at ply 3: broken board', result.error)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""Render positions to PNG images without a display.
+
+Run `python render.py --help` for the command line options. A `Renderer`
+draws on off-screen surfaces through SDL's dummy video driver and keeps
+the empty board and the piece sprites between renders, so a render costs
+a blit per piece and the PNG encoding. `render_batches` spreads batches
+of positions over worker processes with a renderer each, with a bounded
+number of batches in flight so memory use does not grow with the input.
+
+"""
+import argparse
+import collections
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+import assets
+import chess
+import GUI
+
+
+def init_display():
+    """Set a tiny display mode, which converting surfaces needs."""
+    if pygame.display.get_surface() is None:
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+
+class Renderer:
+    """Render boards, or FEN strings, to PNG bytes."""
+
+    def __init__(self, box_size=GUI.BOX_SIZE, atlas=False):
+        init_display()
+        self.box_size = box_size
+        self.sprites = assets.Sprites(atlas=atlas).scaled(box_size)
+        self.board = GUI.board_surface(box_size)
+        self.surface = self.board.copy()
+
+    def draw(self, board):
+        """Draw `board` and return the surface, which the next call draws
+        over.
+
+        """
+        if isinstance(board, str):
+            board = chess.ChessBoard.from_fen(board, lazy_status=True)
+        size = self.box_size
+        self.surface.blit(self.board, (0, 0))
+        for y, row in enumerate(board.get_board()):
+            for x, piece in enumerate(row):
+                if piece is not chess.ChessBoard.EMPTY:
+                    self.surface.blit(self.sprites[piece.symbol],
+                                      (x * size, y * size))
+        return self.surface
+
+    def render(self, board):
+        stream = io.BytesIO()
+        pygame.image.save(self.draw(board), stream, 'board.png')
+        return stream.getvalue()
+
+    def render_batch(self, boards):
+        return [self.render(board) for board in boards]
+
+
+def init_worker(box_size, atlas):
+    global RENDERER
+    RENDERER = Renderer(box_size, atlas)
+
+
+def render_task(fens):
+    return RENDERER.render_batch(fens)
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_batches(fens, workers=None, batch_size=50, box_size=GUI.BOX_SIZE,
+                   atlas=False, queue_size=8):
+    """Render the FEN strings in `fens` in `workers` processes and yield
+    the PNG bytes of every position in order.
+
+    At most `queue_size` batches are submitted and not yet yielded, so
+    `fens` is read only as fast as the images are consumed.
+
+    """
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(box_size, atlas)) as pool:
+        pending = collections.deque()
+        for batch in batches(fens, batch_size):
+            if len(pending) >= max(queue_size, 1):
+                for image in pending.popleft().result():
+                    yield image
+            pending.append(pool.submit(render_task, batch))
+        while pending:
+            for image in pending.popleft().result():
+                yield image
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Render positions to PNG images.')
+    parser.add_argument('files', nargs='+',
+                        help="files with a FEN string per line, '-' for "
+                             'standard input')
+    parser.add_argument('-o', '--output', default='.',
+                        help='directory for the images, named by the line '
+                             'number of their position')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('-b', '--box-size', type=int, default=GUI.BOX_SIZE)
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help='positions handed to a worker at a time')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='batches being rendered or waiting to be '
+                             'written at most')
+    parser.add_argument('--atlas', action='store_true',
+                        help='keep the piece images in a single surface')
+    args = parser.parse_args(argv)
+
+    def fens():
+        for path in args.files:
+            if path == '-':
+                stream = sys.stdin
+            else:
+                stream = open(path)
+            for line in stream:
+                if line.strip():
+                    yield line.strip()
+            if stream is not sys.stdin:
+                stream.close()
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    start = time.time()
+    count = 0
+    for count, image in enumerate(render_batches(
+            fens(), args.workers, args.batch_size, args.box_size,
+            args.atlas, args.queue_size), 1):
+        with open(os.path.join(args.output, '%06d.png' % count), 'wb') as out:
+            out.write(image)
+    elapsed = time.time() - start
+    sys.stderr.write('%d images in %.2fs, %.1f images/s\n' %
+                     (count, elapsed, count / max(elapsed, 1e-9)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import io
+import unittest
+import pygame
+import chess
+import render
+
+FEN = 'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 0 1'
+
+
+class RenderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.renderer = render.Renderer(20)
+
+    def test_render(self):
+        image = pygame.image.load(io.BytesIO(self.renderer.render(FEN)),
+                                  'board.png')
+        self.assertEqual((160, 160), image.get_size())
+        board = chess.ChessBoard.from_fen(FEN)
+        self.assertEqual(self.renderer.render(FEN),
+                         self.renderer.render(board))
+        self.assertNotEqual(self.renderer.render(FEN),
+                            self.renderer.render(chess.ChessBoard()))
+
+    def test_atlas(self):
+        renderer = render.Renderer(20, atlas=True)
+        self.assertEqual(self.renderer.render(FEN), renderer.render(FEN))
+
+    def test_render_batches(self):
+        fens = [FEN, chess.ChessBoard().to_fen(), FEN]
+        images = list(render.render_batches(fens, workers=2, batch_size=2,
+                                            box_size=20))
+        self.assertEqual(self.renderer.render_batch(fens), images)
+
+    def test_render_batches_window(self):
+        read = []
+
+        def fens():
+            for i in range(20):
+                read.append(i)
+                yield FEN
+
+        images = render.render_batches(fens(), workers=1, batch_size=1,
+                                       box_size=20, queue_size=2)
+        next(images)
+        self.assertLessEqual(len(read), 3)
+        self.assertEqual(19, len(list(images)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -158,6 +158,198 @@ class ChessBoardTests(unittest.TestCase):
         result = self.board.any_valid_moves()
         self.assertFalse(result)
 
+    def test_square_attacked(self):
+        result = self.board.square_attacked((4, 5), 'white')
+        self.assertTrue(result)
+        result = self.board.square_attacked((4, 4), 'white')
+        self.assertFalse(result)
+        self.board.move_piece((4, 6), (4, 4))
+        self.board.move_piece((4, 1), (4, 3))
+        result = self.board.square_attacked((0, 2), 'white')
+        self.assertTrue(result)
+        result = self.board.square_attacked((7, 4), 'black')
+        self.assertTrue(result)
+        self.board.move_piece((3, 7), (7, 3))
+        result = self.board.square_attacked((5, 1), 'white')
+        self.assertTrue(result)
+
+    def test_refresh_attacks(self):
+        self.board.move_piece((4, 6), (4, 4))
+        self.board.move_piece((3, 1), (3, 3))
+        self.board.move_piece((4, 4), (3, 3))
+        self.board.move_piece((3, 0), (3, 3))
+        attacked = self.board.attacked
+        self.board.refresh_attacks()
+        self.assertEqual(self.board.attacked, attacked)
+
+    def test_position_hash(self):
+        start = self.board.position_hash
+        self.assertEqual(self.board.zobrist_hash(), start)
+        self.board.move_piece((6, 7), (5, 5))
+        self.board.move_piece((6, 0), (5, 2))
+        self.assertNotEqual(start, self.board.position_hash)
+        self.board.move_piece((5, 5), (6, 7))
+        self.board.move_piece((5, 2), (6, 0))
+        self.assertEqual(start, self.board.position_hash)
+        self.board.move_piece((4, 6), (4, 4))
+        self.assertEqual(self.board.zobrist_hash(), self.board.position_hash)
+        self.board.move_piece((4, 1), (4, 3))
+        self.board.move_piece((4, 7), (4, 6))
+        self.board.move_piece((4, 0), (4, 1))
+        self.board.move_piece((4, 6), (4, 7))
+        self.board.move_piece((4, 1), (4, 0))
+        self.assertEqual(self.board.zobrist_hash(), self.board.position_hash)
+        self.assertEqual(0, self.board.castling_rights())
+
+    def test_position_hash_unmake_move(self):
+        start = self.board.position_hash
+        for move in self.board.legal_moves():
+            self.board.make_move(move)
+            result = self.board.zobrist_hash()
+            self.assertEqual(result, self.board.position_hash)
+            self.board.unmake_move()
+            self.assertEqual(start, self.board.position_hash)
+
+    def test_legal_moves(self):
+        result = self.board.legal_moves()
+        self.assertEqual(20, len(result))
+        self.assertIn(((4, 6), (4, 4), None), result)
+        self.assertIn(((6, 7), (5, 5), None), result)
+        self.board.move_piece((5, 6), (5, 5))
+        self.board.move_piece((4, 1), (4, 3))
+        self.board.move_piece((6, 6), (6, 4))
+        self.board.move_piece((3, 0), (7, 4))
+        self.assertEqual([], self.board.legal_moves())
+
+    def test_legal_moves_castling(self):
+        self.board.board[7][5], self.board.board[7][6] = None, None
+        result = self.board.legal_moves()
+        self.assertIn(((4, 7), (6, 7), None), result)
+        self.assertNotIn(((4, 7), (2, 7), None), result)
+
+    def test_legal_moves_en_passant(self):
+        self.board.move_piece((2, 6), (2, 4))
+        self.board.move_piece((1, 1), (1, 3))
+        self.board.move_piece((2, 4), (2, 3))
+        self.board.move_piece((1, 3), (1, 4))
+        self.board.move_piece((0, 6), (0, 4))
+        result = self.board.legal_moves()
+        self.assertIn(((1, 4), (0, 5), None), result)
+
+    def test_legal_moves_promotion(self):
+        self.board.board[1][0] = chess.Pawn('white')
+        result = [move for move in self.board.legal_moves()
+                  if move[0] == (0, 1)]
+        self.assertEqual(4, len(result))
+        self.assertIn(((0, 1), (1, 0), chess.Queen), result)
+        self.assertIn(((0, 1), (1, 0), chess.Knight), result)
+
+    def test_make_move(self):
+        self.board.make_move(((4, 6), (4, 4), None))
+        result = self.board.empty((4, 6))
+        self.assertTrue(result)
+        self.assertEqual('black', self.board.turn)
+        self.assertEqual((4, 4), self.board.en_passant)
+        self.board.unmake_move()
+        result = self.board.empty((4, 4))
+        self.assertTrue(result)
+        self.assertEqual('white', self.board.turn)
+        self.assertIsNone(self.board.en_passant)
+        self.assertIs(chess.Pawn('white'), self.board.board[6][4])
+
+    def test_unmake_move_castling(self):
+        self.board.board[7][5], self.board.board[7][6] = None, None
+        self.board.make_move(((4, 7), (6, 7), None))
+        self.assertEqual((6, 7), self.board.white_king)
+        result = self.board.board[7][5]
+        self.assertIsInstance(result, chess.Rook)
+        self.assertEqual(12, self.board.castling_rights())
+        self.board.unmake_move()
+        self.assertEqual((4, 7), self.board.white_king)
+        self.assertEqual(15, self.board.castling_rights())
+        result = self.board.empty((5, 7))
+        self.assertTrue(result)
+
+    def test_unmake_move_en_passant(self):
+        self.board.move_piece((2, 6), (2, 4))
+        self.board.move_piece((1, 1), (1, 3))
+        self.board.move_piece((2, 4), (2, 3))
+        self.board.move_piece((1, 3), (1, 4))
+        self.board.move_piece((0, 6), (0, 4))
+        pawn = self.board.board[4][0]
+        self.board.make_move(((1, 4), (0, 5), None))
+        result = self.board.empty((0, 4))
+        self.assertTrue(result)
+        self.board.unmake_move()
+        self.assertIs(pawn, self.board.board[4][0])
+        self.assertEqual((0, 4), self.board.en_passant)
+
+    def test_unmake_move_promotion(self):
+        self.board.board[1][0] = chess.Pawn('white')
+        self.board.refresh_attacks()
+        pawn = self.board.board[1][0]
+        knight = self.board.board[0][1]
+        self.board.make_move(((0, 1), (1, 0), chess.Queen))
+        self.assertIsInstance(self.board.board[0][1], chess.Queen)
+        self.board.unmake_move()
+        self.assertIs(pawn, self.board.board[1][0])
+        self.assertIs(knight, self.board.board[0][1])
+        attacked = self.board.attacked
+        self.board.refresh_attacks()
+        self.assertEqual(self.board.attacked, attacked)
+
+    def test_null_move(self):
+        self.board.make_move(((4, 6), (4, 4), None))
+        fen = self.board.to_fen()
+        position_hash = self.board.position_hash
+        self.board.make_null_move()
+        self.assertEqual('white', self.board.turn)
+        self.assertIsNone(self.board.en_passant)
+        self.assertEqual(self.board.zobrist_hash(), self.board.position_hash)
+        self.assertEqual('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR '
+                         'w KQkq - 1 2', self.board.to_fen())
+        self.board.unmake_null_move()
+        self.assertEqual(fen, self.board.to_fen())
+        self.assertEqual(position_hash, self.board.position_hash)
+        self.board.unmake_move()
+        self.assertEqual([], self.board.undo_stack)
+
+    def test_evaluation(self):
+        self.assertEqual(0, self.board.evaluation())
+        self.assertEqual(24, self.board.phase)
+        moves = [((4, 6), (4, 4), None), ((3, 1), (3, 3), None),
+                 ((4, 4), (3, 3), None), ((4, 1), (4, 3), None),
+                 ((3, 3), (4, 2), None), ((6, 0), (5, 2), None),
+                 ((4, 2), (5, 1), None), ((4, 0), (3, 1), None),
+                 ((5, 1), (6, 0), chess.Knight), ((3, 0), (4, 0), None),
+                 ((6, 7), (5, 5), None), ((1, 0), (2, 2), None),
+                 ((5, 7), (4, 6), None), ((2, 0), (6, 4), None),
+                 ((4, 7), (6, 7), None)]
+        for move in moves:
+            self.board.make_move(move)
+            self.assertEqual(self.board.material_scores(),
+                             (self.board.middlegame, self.board.endgame,
+                              self.board.phase))
+        self.assertEqual(25, self.board.phase)
+        self.assertEqual(self.board.middlegame, -self.board.evaluation())
+        for move in moves:
+            self.board.unmake_move()
+        self.assertEqual(self.board.material_scores(),
+                         (self.board.middlegame, self.board.endgame,
+                          self.board.phase))
+        self.assertEqual(0, self.board.evaluation())
+
+    def test_evaluation_endgame(self):
+        board = chess.ChessBoard.from_fen('8/8/8/4k3/8/8/4P3/4K3 w - - 0 1')
+        self.assertEqual(0, board.phase)
+        self.assertEqual(board.endgame, board.evaluation())
+        board.make_move(((4, 7), (3, 6), None))
+        self.assertEqual(-60, board.evaluation())
+        board = chess.ChessBoard.from_fen('4k3/8/8/8/8/8/8/3QK3 b - - 0 1')
+        self.assertEqual(4, board.phase)
+        self.assertEqual(-(board.middlegame * 4 + board.endgame * 20) // 24,
+                         board.evaluation())
+
     def test_en_passant(self):
         self.board.move_piece((2, 6), (2, 4))
         self.board.move_piece((1, 1), (1, 3))
@@ -258,5 +450,157 @@ class ChessBoardTests(unittest.TestCase):
         status = 'Game in progress.'
         self.assertEqual(status, self.board.get_game_status())
 
+    def test_pieces(self):
+        self.assertIs(chess.Rook('black'), self.board.board[0][0])
+        self.assertIsNot(chess.Rook('white'), chess.Rook('black'))
+        self.assertEqual('N', chess.Knight('white').symbol)
+        self.assertEqual('n', chess.Knight('black').symbol)
+        with self.assertRaises(AttributeError):
+            self.board.board[0][0].color = 'white'
+
+    def test_castling_rights(self):
+        self.board.board[6][7] = None
+        self.board.refresh()
+        self.board.move_piece((7, 7), (7, 5))
+        self.board.move_piece((0, 1), (0, 2))
+        self.board.move_piece((7, 5), (7, 7))
+        self.assertEqual(14, self.board.castling_rights())
+        self.assertEqual(self.board.zobrist_hash(), self.board.position_hash)
+        self.board.board[0][4] = None
+        self.board.refresh()
+        self.assertEqual(2, self.board.castling_rights())
+
+    def test_direct_writes(self):
+        board = self.board.get_board()
+        board[1][4] = None
+        board[6][4] = None
+        board[5][4] = chess.Queen('white')
+        self.board.move_piece((0, 6), (0, 5))
+        self.assertTrue(self.board.check())
+        self.assertEqual(self.board.zobrist_hash(), self.board.position_hash)
+        self.assertFalse(self.board.castle_check((4, 0), (7, 0), 'black'))
+        self.assertEqual(3, len(self.board.legal_moves()))
+
+        self.board = type(self.board)()
+        board = self.board.get_board()
+        board[6][4] = None
+        board[6][5] = None
+        board[3][5] = chess.Rook('black')
+        self.assertFalse(self.board.move_piece((4, 7), (5, 6)))
+
+        self.board = type(self.board)()
+        self.board.legal_moves()
+        board = self.board.get_board()
+        board[6][4] = None
+        board[3][4] = chess.Rook('black')
+        self.assertFalse(self.board.move_piece((0, 6), (0, 5)))
+        self.assertTrue(self.board.move_piece((3, 7), (4, 6)))
+
+    def test_from_fen(self):
+        board = self.board.from_fen('r3k2r/Pp1p1ppp/1b3nbN/nPp5/BBP1P3/'
+                                    'q4N2/Pp1P2PP/R2Q1RK1 w kq c6 0 1')
+        self.assertIsInstance(board, type(self.board))
+        self.assertEqual('white', board.turn)
+        self.assertEqual((6, 7), board.white_king)
+        self.assertEqual((4, 0), board.black_king)
+        self.assertEqual(12, board.castling_rights())
+        self.assertEqual((2, 3), board.en_passant)
+        self.assertIs(chess.Queen('black'), board.board[5][0])
+        self.assertEqual(board.zobrist_hash(), board.position_hash)
+        with self.assertRaises(ValueError):
+            self.board.from_fen('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w - -')
+        with self.assertRaises(ValueError):
+            self.board.from_fen('rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/'
+                                'RNBQKBNR w KQkq - 0 1')
+
+    def test_from_fen_rejects_impossible_pawns(self):
+        for fen in ('4k3/8/8/8/8/8/8/p3K3 b - - 0 1',
+                    'P3k3/8/8/8/8/8/8/4K3 w - - 0 1',
+                    '4k3/8/8/8/8/8/8/4K2P w - - 0 1',
+                    '4k3/8/8/8/8/8/4P3/4K3 b - e3 0 1',
+                    '4k3/8/8/8/4p3/8/8/4K3 b - e3 0 1',
+                    '4k3/8/8/8/8/8/8/4K3 w - d6 0 1'):
+            with self.assertRaises(ValueError):
+                self.board.from_fen(fen)
+        board = self.board.from_fen('4k3/8/8/8/4P3/8/8/4K3 b - e3 0 1')
+        self.assertEqual((4, 4), board.en_passant)
+
+    def test_set_fen_rejected(self):
+        fen = self.board.to_fen()
+        for bad in ('8/8/8/8/8/8/8/8 w - - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQx - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - x 1',
+                    '4k3/8/8/8/8/8/4P3/4K3 b - e3 0 1'):
+            with self.assertRaises(ValueError):
+                self.board.set_fen(bad)
+            self.assertEqual(fen, self.board.to_fen())
+            self.assertEqual((4, 7), self.board.white_king)
+
+    def test_to_fen(self):
+        fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+        self.assertEqual(fen, self.board.to_fen())
+        self.board.move_piece((4, 6), (4, 4))
+        self.board.move_piece((6, 0), (5, 2))
+        self.assertEqual('rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR '
+                         'w KQkq - 1 2', self.board.to_fen())
+        fen = self.board.to_fen()
+        self.board.make_move(((6, 7), (5, 5), None))
+        self.board.unmake_move()
+        self.assertEqual(fen, self.board.to_fen())
+        board = self.board.from_fen(fen)
+        self.assertEqual(fen, board.to_fen())
+
+    def test_pin_state(self):
+        board = self.board.from_fen('4r1k1/8/8/8/8/8/4B3/4K1N1 w - - 0 1')
+        pins, checkers, block = board.pin_state()
+        self.assertEqual([(4, 6)], list(pins))
+        self.assertIn((4, 0), pins[4, 6])
+        self.assertEqual([], checkers)
+        for move in board.legal_moves():
+            self.assertNotEqual((4, 6), move[0])
+        board = self.board.from_fen('4r1k1/8/8/1B6/8/8/8/4K1N1 w - - 0 1')
+        pins, checkers, block = board.pin_state()
+        self.assertEqual([(4, 0)], checkers)
+        self.assertEqual(frozenset((4, y) for y in range(7)), block)
+        result = sorted(move[1] for move in board.legal_moves())
+        self.assertEqual([(3, 6), (3, 7), (4, 0), (4, 6), (4, 6), (5, 6),
+                          (5, 7)], result)
+
+    def test_attackers(self):
+        board = chess.ChessBoard.from_fen('3rk3/8/2n5/3p4/4P3/8/3R4/3QK3 '
+                                          'w - - 0 1')
+        white, black = chess.ChessBoard.WHITE, chess.ChessBoard.BLACK
+        self.assertEqual([(4, 4), (3, 6)], board.attackers((3, 3), white))
+        self.assertEqual([(4, 4), (3, 7)],
+                         board.attackers((3, 3), white, set([(3, 6)])))
+        self.assertEqual([(3, 3)], board.attackers((4, 4), black))
+        self.assertEqual([(2, 2)], board.attackers((3, 4), black))
+        self.assertEqual([(3, 7), (4, 7)],
+                         sorted(board.attackers((3, 6), white)))
+
+    def test_square_tables(self):
+        self.assertEqual(((1, 2), (2, 1)), chess.KNIGHT_SQUARES[0, 0])
+        self.assertEqual(8, len(chess.KING_SQUARES[4, 4]))
+        self.assertEqual(((5, 5), (6, 6), (7, 7)),
+                         chess.RAY_SQUARES[4, 4][1, 1])
+        rays = chess.PIECE_RAYS[chess.Pawn('white')][4, 6]
+        self.assertEqual((((5, 5),), ((3, 5),)), rays)
+
+    def test_valid_move_stops_at_capture(self):
+        board = self.board.from_fen('4k3/8/8/rP2Q3/8/8/8/4K3 b - - 0 1')
+        result = board.valid_move((0, 3), ((1, 0),))
+        self.assertFalse(result)
+
+    def test_copy(self):
+        board = self.board.copy()
+        board.move_piece((4, 6), (4, 4))
+        self.assertTrue(self.board.empty((4, 4)))
+        self.assertEqual('white', self.board.turn)
+        self.assertIs(self.board.board[6][4], board.board[4][4])
+        self.assertEqual(board.zobrist_hash(), board.position_hash)
+        attacked = board.attacked
+        board.refresh_attacks()
+        self.assertEqual(board.attacked, attacked)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,207 @@
+"""Validate PGN archives by replaying every game in worker processes.
+
+Run `python validate.py --help` for the command line options. Games are
+read as a stream and handed to the workers in batches through a bounded
+queue, so memory use does not grow with the size of the archive. Every
+game gets a line in the results file and the throughput of every worker
+is reported when all games are done.
+
+"""
+import argparse
+import multiprocessing
+import queue
+import sys
+import time
+import chess
+import pgn
+from cache import PositionCache
+
+DECISIVE = {chess.ChessBoard.WHITE_WIN: '1-0',
+            chess.ChessBoard.BLACK_WIN: '0-1',
+            chess.ChessBoard.STALEMATE: '1/2-1/2'}
+
+
+def verdict(result):
+    """Return `ok`, `error`, `illegal` or `mismatch` for a `GameResult`.
+
+    A game is a mismatch if it ends in mate or stalemate but its result
+    tag says otherwise.
+
+    """
+    if result.status is None:
+        return 'error'
+    if result.illegal_move is not None:
+        return 'illegal'
+    expected = DECISIVE.get(result.status)
+    if expected is not None and expected != result.game.result:
+        return 'mismatch'
+    return 'ok'
+
+
+def worker(name, tasks, results, board_class, cache_size):
+    """Replay the batches of `(index, game)` pairs from `tasks` until a
+    `None` batch and put the result rows on `results`.
+
+    """
+    cache = PositionCache(cache_size) if cache_size else None
+    start = time.time()
+    games = plies = 0
+    while True:
+        batch = tasks.get()
+        if batch is None:
+            break
+        rows = []
+        for index, game in batch:
+            result = pgn.replay(game, board_class, cache)
+            rows.append((index, game.result, result.status, result.plies,
+                         result.illegal_move, verdict(result)))
+            games += 1
+            plies += result.plies
+        results.put(('rows', rows))
+    results.put(('done', (name, games, plies, time.time() - start)))
+
+
+def batches(games, size):
+    batch = []
+    for index, game in enumerate(games):
+        batch.append((index, game))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate(lines, out, workers=2, batch_size=100, queue_size=8,
+             board_class=chess.ChessBoard, cache_size=0):
+    """Replay the PGN `lines` in `workers` processes and write a line per
+    game to `out`, in archive order.
+
+    Returns the verdict counts and `(name, games, plies, elapsed)` for
+    every worker.
+
+    """
+    tasks = multiprocessing.Queue(queue_size)
+    results = multiprocessing.Queue(queue_size)
+    processes = [multiprocessing.Process(
+        target=worker, args=('worker-%d' % i, tasks, results, board_class,
+                             cache_size))
+        for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    counts = dict((name, 0) for name in ('ok', 'illegal', 'mismatch',
+                                         'error'))
+    stats = []
+    pending = {}
+    written = [0]
+
+    def receive(block):
+        try:
+            kind, value = results.get(block, 0.1)
+        except queue.Empty:
+            return
+        if kind == 'done':
+            stats.append(value)
+            return
+        for row in value:
+            pending[row[0]] = row
+        while written[0] in pending:
+            index, result, status, plies, illegal_move, name = \
+                pending.pop(written[0])
+            out.write('%d\t%s\t%s\t%d\t%s\t%s\n' %
+                      (index + 1, result, status, plies,
+                       illegal_move or '-', name))
+            counts[name] += 1
+            written[0] += 1
+
+    def check_workers():
+        if len(stats) < workers and not any(
+                process.is_alive() for process in processes):
+            raise RuntimeError('a worker process died')
+
+    def send(batch):
+        while True:
+            try:
+                tasks.put(batch, True, 0.1)
+                return
+            except queue.Full:
+                receive(False)
+                check_workers()
+
+    out.write('game\tresult\tstatus\tplies\tillegal_move\tverdict\n')
+    try:
+        for batch in batches(pgn.read_games(lines), batch_size):
+            send(batch)
+        for process in processes:
+            send(None)
+        while len(stats) < workers:
+            receive(True)
+            check_workers()
+    finally:
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+    return counts, sorted(stats)
+
+
+def report(counts, stats, elapsed, out):
+    total_games = total_plies = 0
+    for name, games, plies, busy in stats:
+        out.write('%-10s %8d games %10d plies %8.1f games/s %10.1f plies/s\n'
+                  % (name, games, plies, games / max(busy, 1e-9),
+                     plies / max(busy, 1e-9)))
+        total_games += games
+        total_plies += plies
+    out.write('%-10s %8d games %10d plies %8.1f games/s %10.1f plies/s\n' %
+              ('total', total_games, total_plies,
+               total_games / max(elapsed, 1e-9),
+               total_plies / max(elapsed, 1e-9)))
+    out.write(', '.join('%s: %d' % item for item in sorted(counts.items())) +
+              '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate PGN archives.')
+    parser.add_argument('files', nargs='+',
+                        help="PGN files to validate, '-' for standard input")
+    parser.add_argument('-o', '--output', default='-',
+                        help='results file (default: standard output)')
+    parser.add_argument('-j', '--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='games handed to a worker at a time')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='batches waiting in each queue at most')
+    parser.add_argument('--cache', type=int, default=0,
+                        help='position cache entries per worker')
+    args = parser.parse_args(argv)
+
+    def lines():
+        for path in args.files:
+            if path == '-':
+                for line in sys.stdin:
+                    yield line
+                continue
+            with open(path, encoding='utf-8', errors='replace') as stream:
+                for line in stream:
+                    yield line
+
+    if args.output == '-':
+        out = sys.stdout
+    else:
+        out = open(args.output, 'w')
+    start = time.time()
+    try:
+        counts, stats = validate(lines(), out, max(args.workers, 1),
+                                 args.batch_size, args.queue_size,
+                                 chess.ChessBoard, args.cache)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    report(counts, stats, time.time() - start, sys.stderr)
+    return 0 if counts['ok'] == sum(counts.values()) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
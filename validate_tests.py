@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import chess
+import pgn
+import pgn_tests
+import validate
+
+GAMES = '''[Result "1-0"]
+
+1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7# 1-0
+
+[Result "0-1"]
+
+1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7# 0-1
+
+1. e4 e5 2. Ke3 *
+
+1. d4 d5 1/2-1/2
+'''
+
+
+class DyingBoard(chess.ChessBoard):
+
+    def __init__(self, *args, **kwargs):
+        os._exit(1)
+
+
+class ValidateTests(unittest.TestCase):
+
+    def test_validate(self):
+        out = io.StringIO()
+        counts, stats = validate.validate(GAMES.splitlines(True) * 5, out,
+                                          workers=2, batch_size=3,
+                                          queue_size=1)
+        self.assertEqual({'ok': 10, 'mismatch': 5, 'illegal': 5,
+                          'error': 0}, counts)
+        self.assertEqual(2, len(stats))
+        self.assertEqual(20, sum(games for name, games, plies, busy
+                                 in stats))
+        self.assertEqual(5 * (7 + 7 + 2 + 2),
+                         sum(plies for name, games, plies, busy in stats))
+        lines = out.getvalue().splitlines()
+        self.assertEqual(21, len(lines))
+        self.assertEqual(['1', '1-0', 'White win!', '7', '-', 'ok'],
+                         lines[1].split('\t'))
+        self.assertEqual('mismatch', lines[2].split('\t')[-1])
+        self.assertEqual(['3', '*', 'Game in progress.', '2', 'Ke3',
+                          'illegal'], lines[3].split('\t'))
+        self.assertEqual('20', lines[-1].split('\t')[0])
+
+    def test_validate_errors(self):
+        out = io.StringIO()
+        counts, stats = validate.validate(
+            GAMES.splitlines(True), out, workers=1,
+            board_class=pgn_tests.BrokenBoard)
+        self.assertEqual({'ok': 1, 'mismatch': 0, 'illegal': 1,
+                          'error': 2}, counts)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(['1', '1-0', 'None', '2', '-', 'error'],
+                         lines[1].split('\t'))
+
+    def test_workers_died(self):
+        with self.assertRaises(RuntimeError):
+            validate.validate(GAMES.splitlines(True) * 20, io.StringIO(),
+                              workers=1, batch_size=1, queue_size=1,
+                              board_class=DyingBoard)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            games = os.path.join(directory, 'games.pgn')
+            results = os.path.join(directory, 'results.tsv')
+            with open(games, 'w') as stream:
+                stream.write(GAMES)
+            with contextlib.redirect_stderr(io.StringIO()) as err:
+                status = validate.main([games, '-o', results, '-j', '1'])
+            with open(results) as stream:
+                lines = stream.read().splitlines()
+        self.assertEqual(1, status)
+        self.assertEqual(5, len(lines))
+        self.assertIn('ok: 2', err.getvalue())
+
+    def test_verdict(self):
+        game = pgn.Game({}, ['e4', 'e5'], '1-0')
+        self.assertEqual('ok', validate.verdict(pgn.replay(game)))
+        game = pgn.Game({'FEN': 'bad'}, [], '*')
+        self.assertEqual('error', validate.verdict(pgn.replay(game)))
+
+if __name__ == '__main__':
+    unittest.main()